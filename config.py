@@ -1,26 +1,46 @@
+import os
+from types import MappingProxyType
+
 from pynput import keyboard
 
 # --- Configuration ---
 DEFAULT_SCORES_DIRECTORY = 'scores'
-PREV_SCORE_HOTKEY_COMBINATION = {keyboard.Key.f7}
-NEXT_SCORE_HOTKEY_COMBINATION = {keyboard.Key.f8}
-START_HOTKEY_COMBINATION = {keyboard.Key.f9}
-STOP_HOTKEY_COMBINATION = {keyboard.Key.f10}
-PAUSE_RESUME_HOTKEY_COMBINATION = {keyboard.Key.f11} # Added Pause key
-EXIT_HOTKEY_COMBINATION = {keyboard.Key.esc}
+# Per-user cache dir for the score list and prepared scores; prepared entries are unpickled,
+# so they must not live where other users can write
+CACHE_DIRECTORY = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                               'scoreplayer')
+PREV_SCORE_HOTKEY_COMBINATION = frozenset({keyboard.Key.f7})
+NEXT_SCORE_HOTKEY_COMBINATION = frozenset({keyboard.Key.f8})
+START_HOTKEY_COMBINATION = frozenset({keyboard.Key.f9})
+STOP_HOTKEY_COMBINATION = frozenset({keyboard.Key.f10})
+PAUSE_RESUME_HOTKEY_COMBINATION = frozenset({keyboard.Key.f11}) # Added Pause key
+EXIT_HOTKEY_COMBINATION = frozenset({keyboard.Key.esc})
+NUDGE_EARLIER_HOTKEY_COMBINATION = frozenset({keyboard.Key.f5}) # Play notes slightly earlier
+NUDGE_LATER_HOTKEY_COMBINATION = frozenset({keyboard.Key.f6}) # Play notes slightly later
+NUDGE_STEP_SEC = 0.005 # Timing change per nudge hotkey press
 DEFAULT_TEMPO_BPM = 120 # Default BPM if not found in score
 
 # --- Keyboard Range Definition ---
 KEYBOARD_MIN_MIDI = 48 # C3
 KEYBOARD_MAX_MIDI = 83 # B5
 
+# Lookup tables below are wrapped in MappingProxyType: they are read-only after import
+
 # Define MIDI ranges supported by different backends
 # Used to determine if full score playback is feasible
-BACKEND_MIDI_RANGES = {
-    'pynput': {'min': KEYBOARD_MIN_MIDI, 'max': KEYBOARD_MAX_MIDI}, # C3-B5
-    'sample': {'min': 36, 'max': 92}, # C2-G#6 (Based on provided sample map keys)
-    'midi': {'min': 0, 'max': 127}  # 完整MIDI范围，所有音符都支持
-}
+BACKEND_MIDI_RANGES = MappingProxyType({
+    'pynput': MappingProxyType({'min': KEYBOARD_MIN_MIDI, 'max': KEYBOARD_MAX_MIDI}), # C3-B5
+    'sample': MappingProxyType({'min': 36, 'max': 92}), # C2-G#6 (Based on provided sample map keys)
+    'midi': MappingProxyType({'min': 0, 'max': 127})  # 完整MIDI范围，所有音符都支持
+})
+
+# Estimated delay from the backend call to audible sound, in seconds.
+# Notes are dispatched this much ahead of their beat so the onset lands on time.
+BACKEND_LATENCIES = MappingProxyType({
+    'pynput': 0.01, # Modifier key settle delay before the tap
+    'sample': 0.012, # Roughly one pygame mixer buffer
+    'midi': 0.0,
+})
 
 # MIDI后端配置
 DEFAULT_MIDI_PORT_NAME = None  # 默认使用第一个可用端口，如果无可用端口则创建虚拟端口
@@ -34,24 +54,28 @@ DEFAULT_MIDI_INSTRUMENT = 0  # 0 = 大钢琴 (Acoustic Grand Piano)
 
 # For pynput_backend, can be moved later if more backends are added
 # Maps standard accidental symbols to pynput modifier keys
-ACCIDENTAL_MODIFIERS = {
+ACCIDENTAL_MODIFIERS = MappingProxyType({
     '#': keyboard.Key.shift,
     '-': keyboard.Key.ctrl, # Using '-' for flat (b) from music21 pitch name
-}
+})
+# Spelling used for every black key: '#' sends the white key below with Shift, '-' the white
+# key above with Ctrl. Scores reach the backend as MIDI numbers, so the score's own spelling
+# is gone; set '-' for target apps that only bind Ctrl (flats).
+BLACK_KEY_SPELLING = '#'
 
 # For pynput_backend, can be moved later
 # This map uses the *internal* Jianpu representation derived from standard notation
-KEY_MAP = {
+KEY_MAP = MappingProxyType({
     '1': 'a', '2': 's', '3': 'd', '4': 'f', '5': 'g', '6': 'h', '7': 'j',
     '1̇': 'q', '2̇': 'w', '3̇': 'e', '4̇': 'r', '5̇': 't', '6̇': 'y', '7̇': 'u',
     '1̣': 'z', '2̣': 'x', '3̣': 'c', '4̣': 'v', '5̣': 'b', '6̣': 'n', '7̣': 'm',
-}
+})
 
 # For pynput_backend, can be moved later
 # For translating standard note letters (C-B) to base Jianpu digits (1-7)
-NOTE_TO_JIANPU_BASE = {
+NOTE_TO_JIANPU_BASE = MappingProxyType({
     'C': '1', 'D': '2', 'E': '3', 'F': '4', 'G': '5', 'A': '6', 'B': '7',
-}
+})
 
 # Derived Configurations
 # ABS_SCORES_DIRECTORY = os.path.abspath(SCORES_DIRECTORY) 
\ No newline at end of file
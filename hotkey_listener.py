@@ -1,97 +1,153 @@
-import sys
+import logging
 import threading
+from typing import TYPE_CHECKING
 
 from pynput import keyboard
 
 from config import (
     EXIT_HOTKEY_COMBINATION,
     NEXT_SCORE_HOTKEY_COMBINATION,
+    NUDGE_EARLIER_HOTKEY_COMBINATION,
+    NUDGE_LATER_HOTKEY_COMBINATION,
     PAUSE_RESUME_HOTKEY_COMBINATION,
     PREV_SCORE_HOTKEY_COMBINATION,
     START_HOTKEY_COMBINATION,
     STOP_HOTKEY_COMBINATION,
 )
-from player import Player
+
+if TYPE_CHECKING:
+    from player import Player # Imported by main() only after backend selection, since it pulls in music21
+
+# Records propagate to the queue handler main() installs on the root logger, so the
+# pynput callback thread never blocks on console I/O. INFO is kept even when the
+# root level is WARNING, so pressed hotkeys are still reported.
+log = logging.getLogger('hotkeys')
+log.setLevel(logging.INFO)
+
+class _ActionRing:
+    """Fixed-capacity FIFO of callables for a single consumer thread.
+
+    The buffer is preallocated, so pushing an action never allocates.
+    """
+
+    def __init__(self, capacity: int):
+        self._buffer = [None] * capacity
+        self._capacity = capacity
+        self._head = 0 # Next slot to pop
+        self._count = 0
+        self._cv = threading.Condition()
+
+    def push(self, action) -> bool:
+        """Appends an action. Returns False (dropping it) if the ring is full."""
+        with self._cv:
+            if self._count == self._capacity:
+                return False
+            self._buffer[(self._head + self._count) % self._capacity] = action
+            self._count += 1
+            self._cv.notify()
+        return True
+
+    def pop(self):
+        """Blocks until an action is available and returns it."""
+        with self._cv:
+            while not self._count:
+                self._cv.wait()
+            action = self._buffer[self._head]
+            self._buffer[self._head] = None
+            self._head = (self._head + 1) % self._capacity
+            self._count -= 1
+        return action
+
+
+def hotkey_string(combination) -> str:
+    """Formats a set of pynput keys in the '<ctrl>+a' syntax used by keyboard.HotKey."""
+    parts = []
+    for key in combination:
+        if isinstance(key, keyboard.Key):
+            parts.append(f"<{key.name}>")
+        else:
+            parts.append(key.char)
+    return '+'.join(sorted(parts))
 
 
 class HotkeyListener:
-    def __init__(self, player: Player):
+    def __init__(self, player: 'Player'):
         self.player = player
-        self.current_pressed_keys = set()
         self.listener_thread: threading.Thread | None = None
         self._stop_listening = threading.Event()
-        self._listener_instance: keyboard.Listener | None = None
-
-    def _on_press(self, key):
-        """Callback for key press events."""
-        self.current_pressed_keys.add(key)
-
-    def _on_release(self, key):
-        """Callback for key release events. Handles hotkey logic."""
-        pressed_combination = frozenset(self.current_pressed_keys)
-
-        action_taken = False
-        if pressed_combination == PREV_SCORE_HOTKEY_COMBINATION:
-            print("Hotkey: Previous Track")
-            self.player.prev_track()
-            action_taken = True
-        elif pressed_combination == NEXT_SCORE_HOTKEY_COMBINATION:
-            print("Hotkey: Next Track")
-            self.player.next_track()
-            action_taken = True
-        elif pressed_combination == START_HOTKEY_COMBINATION:
+        self._listener_instance: keyboard.GlobalHotKeys | None = None
+        self._stop_lock = threading.Lock() # Guards _listener_instance hand-off
+        self._cleaned_up = threading.Event() # Set once player.cleanup() has been requested
+        # Hotkey actions run on a worker thread so the pynput callback returns
+        # immediately, even when an action blocks (e.g. stopping playback).
+        self._action_queue = _ActionRing(16)
+        self._worker_thread: threading.Thread | None = None
+        # Hotkey combination -> (description, action)
+        self._dispatch = {
+            PREV_SCORE_HOTKEY_COMBINATION: ("Previous Track", self.player.prev_track),
+            NEXT_SCORE_HOTKEY_COMBINATION: ("Next Track", self.player.next_track),
             # Player's start_or_resume handles both starting and resuming
-            print("Hotkey: Start/Resume")
-            self.player.start_or_resume()
-            action_taken = True
-        elif pressed_combination == STOP_HOTKEY_COMBINATION:
-            print("Hotkey: Stop")
-            self.player.stop()
-            action_taken = True
-        elif pressed_combination == PAUSE_RESUME_HOTKEY_COMBINATION:
-            print("Hotkey: Pause/Resume Toggle")
-            self.player.pause_resume()
-            action_taken = True
-        elif pressed_combination == EXIT_HOTKEY_COMBINATION:
-            print("Hotkey: Exit")
-            self.stop() # Signal the listener loop to stop
-            action_taken = True
-
-        # Cleanup the released key
-        try:
-            self.current_pressed_keys.remove(key)
-        except KeyError:
-            # Key might have been released programmatically or missed
-            pass
-        # Optional: If an action was taken, clear all pressed keys
-        # This prevents issues if modifier keys were part of the combo
-        # and weren't released exactly simultaneously.
-        # if action_taken:
-        #    self.current_pressed_keys.clear()
+            START_HOTKEY_COMBINATION: ("Start/Resume", self.player.start_or_resume),
+            STOP_HOTKEY_COMBINATION: ("Stop", self.player.stop),
+            PAUSE_RESUME_HOTKEY_COMBINATION: ("Pause/Resume Toggle", self.player.pause_resume),
+            NUDGE_EARLIER_HOTKEY_COMBINATION: ("Nudge Earlier", self.player.nudge_earlier),
+            NUDGE_LATER_HOTKEY_COMBINATION: ("Nudge Later", self.player.nudge_later),
+            EXIT_HOTKEY_COMBINATION: ("Exit", self.stop), # Signal the listener loop to stop
+        }
+
+    def _make_callback(self, description: str, action):
+        """Wraps a hotkey action for keyboard.GlobalHotKeys."""
+        def callback():
+            log.info("Hotkey: %s", description)
+            if not self._action_queue.push(action):
+                log.warning("Hotkey queue full, dropping '%s'.", description)
+        return callback
 
+    def _run_worker(self):
+        """Runs queued hotkey actions, one at a time."""
+        while True:
+            action = self._action_queue.pop()
+            try:
+                action()
+            except Exception:
+                log.exception("Error running hotkey action")
 
     def _run_listener(self):
         """Internal method to run the listener loop."""
-        print("Starting pynput listener...")
+        log.info("Starting pynput listener...")
+        listener = None
         try:
-            self._listener_instance = keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
-            self._listener_instance.start()
-            print("pynput listener started.")
+            # GlobalHotKeys tracks pressed keys itself and only calls back into
+            # Python when a registered combination completes.
+            listener = keyboard.GlobalHotKeys({
+                hotkey_string(combo): self._make_callback(description, action)
+                for combo, (description, action) in self._dispatch.items()
+            })
+            with self._stop_lock:
+                if self._stop_listening.is_set():
+                    return # stop() was called before the listener existed
+                self._listener_instance = listener
+                listener.start()
+            log.info("pynput listener started.")
             # Keep this thread alive until stop is called
-            self._listener_instance.join()
+            listener.join()
         except Exception as e:
-            print(f"Error in hotkey listener thread: {e}", file=sys.stderr)
+            log.error("Error in hotkey listener thread: %s", e)
             # Attempt to stop gracefully if instance exists
-            if self._listener_instance:
+            if listener:
                 try:
-                    self._listener_instance.stop()
+                    listener.stop()
                 except Exception as stop_e:
-                     print(f"Error trying to stop listener after error: {stop_e}", file=sys.stderr)
+                     log.error("Error trying to stop listener after error: %s", stop_e)
         finally:
-            print("pynput listener stopped.")
+            log.info("pynput listener stopped.")
             # Signal player cleanup if listener stops unexpectedly or normally
-            print("Requesting player cleanup...")
-            self.player.cleanup() # Request player cleanup when listener stops
+            with self._stop_lock:
+                already_cleaned_up = self._cleaned_up.is_set()
+                self._cleaned_up.set()
+            if not already_cleaned_up:
+                log.info("Requesting player cleanup...")
+                self.player.cleanup() # Request player cleanup when listener stops
 
     def start(self):
         """Starts the keyboard listener in a separate thread."""
@@ -99,6 +155,10 @@ class HotkeyListener:
             print("Listener already running.")
             return
         self._stop_listening.clear()
+        self._cleaned_up.clear()
+        if not self._worker_thread or not self._worker_thread.is_alive():
+            self._worker_thread = threading.Thread(target=self._run_worker, daemon=True)
+            self._worker_thread.start()
         self.listener_thread = threading.Thread(target=self._run_listener, daemon=True)
         self.listener_thread.start()
 
@@ -108,14 +168,21 @@ class HotkeyListener:
             print("Listener not running.")
             return
 
-        print("Stopping hotkey listener...")
-        self._stop_listening.set()
-        if self._listener_instance:
-             try:
-                # This is the correct way to stop a pynput listener from another thread
-                keyboard.Listener.stop(self._listener_instance)
-             except Exception as e:
-                 print(f"Error sending stop signal to pynput listener: {e}")
+        # Take the instance under the lock so concurrent stop() calls
+        # (e.g. Ctrl+C racing the Exit hotkey) only signal it once.
+        with self._stop_lock:
+            if self._stop_listening.is_set():
+                return # Already stopping
+            print("Stopping hotkey listener...")
+            self._stop_listening.set()
+            instance = self._listener_instance
+            self._listener_instance = None
+        if instance:
+            try:
+                # pynput listeners may be stopped from any thread
+                instance.stop()
+            except Exception as e:
+                print(f"Error sending stop signal to pynput listener: {e}")
         # Wait briefly for the thread to potentially exit after stop signal
         # self.listener_thread.join(timeout=0.5)
         # Don't join here, let the finally block in _run_listener handle cleanup
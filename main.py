@@ -1,11 +1,15 @@
 import argparse
+import atexit
+import importlib.util
+import logging
+import logging.handlers
 import os
+import queue
 import sys
 
-# Check for music21 before other imports that might depend on it indirectly
-try:
-    import music21
-except ImportError:
+# Check for music21 before other imports that might depend on it indirectly.
+# find_spec only locates the package; the (slow) import happens in main(), via player and score.
+if importlib.util.find_spec('music21') is None:
     print("Error: music21 library not found.", file=sys.stderr)
     print("Please install it using: pip install music21", file=sys.stderr)
     sys.exit(1)
@@ -17,17 +21,32 @@ from config import (
     DEFAULT_SCORES_DIRECTORY,
     EXIT_HOTKEY_COMBINATION,
     NEXT_SCORE_HOTKEY_COMBINATION,
+    NUDGE_EARLIER_HOTKEY_COMBINATION,
+    NUDGE_LATER_HOTKEY_COMBINATION,
     PAUSE_RESUME_HOTKEY_COMBINATION,
     PREV_SCORE_HOTKEY_COMBINATION,
     START_HOTKEY_COMBINATION,
     STOP_HOTKEY_COMBINATION,
 )
-from hotkey_listener import HotkeyListener
-from playback.pynput_backend import PynputKeyboardBackend
+from hotkey_listener import HotkeyListener, hotkey_string
 
-# We'll import other backends conditionally later
-from player import Player
-from score import scan_scores
+# Backend name -> (module, class name, pip package, {constructor kwarg: args attribute}).
+# Backend modules are imported only when selected.
+BACKENDS = {
+    'pynput': ('playback.pynput_backend', 'PynputKeyboardBackend', 'pynput', {}),
+    'sample': ('playback.sample_backend', 'SamplePlaybackBackend', 'pygame', {}),
+    'midi': ('playback.midi_backend', 'MidiPlaybackBackend', 'python-rtmidi',
+             {'port_name': 'midi_port', 'instrument': 'midi_instrument'}),
+}
+FALLBACK_BACKEND = 'pynput'
+
+
+def create_backend(name: str, args: argparse.Namespace):
+    """Imports and instantiates the named playback backend."""
+    module_name, class_name, _, arg_map = BACKENDS[name]
+    backend_class = getattr(importlib.import_module(module_name), class_name)
+    kwargs = {kwarg: getattr(args, attr) for kwarg, attr in arg_map.items()}
+    return backend_class(**kwargs)
 
 
 def main():
@@ -50,7 +69,7 @@ def main():
         '-b', '--backend',
         type=str,
         default='pynput',
-        choices=['pynput', 'sample', 'midi'],
+        choices=list(BACKENDS),
         help='Playback backend: pynput (keyboard simulation), sample (audio files), or midi (MIDI output). Default: pynput.'
     )
     parser.add_argument(
@@ -71,57 +90,69 @@ def main():
         default=DEFAULT_MIDI_INSTRUMENT,
         help='MIDI instrument program number (0-127) for midi backend. Default: 0 (Acoustic Grand Piano).'
     )
+    parser.add_argument(
+        '--warm-cache',
+        action='store_true',
+        help='Prepare all uncached scores in background processes at startup, so any track starts without parsing.'
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Log every note/chord/rest as it is played (off by default to keep the playback loop lean).'
+    )
     args = parser.parse_args()
 
+    # Per-note messages from the backends are DEBUG-level and only formatted when enabled.
+    # Records are queued and written by a listener thread, so the playback, scheduler
+    # and hotkey callback threads never block on console I/O.
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter('%(message)s'))
+    log_listener = logging.handlers.QueueListener(log_queue, log_handler)
+    log_listener.start()
+    atexit.register(log_listener.stop) # Flush pending messages on exit
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, format='%(message)s',
+                        handlers=[logging.handlers.QueueHandler(log_queue)])
+
     # --- Initialization ---
     print("--- Piano Player Initializing ---")
-    
-    # Determine actual scores directory and get absolute path
-    scores_dir = args.directory
-    abs_scores_dir = os.path.abspath(scores_dir)
-    print(f"Using scores directory: {abs_scores_dir}")
-    
-    # Scan for scores initially using the specified directory
-    discovered_scores = scan_scores(scores_dir)
 
     # Initialize Playback Backend based on argument
     playback_backend = None
-    if args.backend == 'pynput':
-        playback_backend = PynputKeyboardBackend()
-    elif args.backend == 'sample':
-        try:
-            from playback.sample_backend import SamplePlaybackBackend
-            playback_backend = SamplePlaybackBackend()
-        except ImportError as e:
-            print(f"Error importing SamplePlaybackBackend: {e}", file=sys.stderr)
-            print("Please ensure pygame is installed ('pip install pygame'). Falling back to pynput.", file=sys.stderr)
-            playback_backend = PynputKeyboardBackend() # Fallback
-        except Exception as e:
-            print(f"Error initializing SamplePlaybackBackend: {e}", file=sys.stderr)
-            print("Falling back to pynput backend.", file=sys.stderr)
-            playback_backend = PynputKeyboardBackend() # Fallback
-    elif args.backend == 'midi':
+    if args.backend == FALLBACK_BACKEND:
+        playback_backend = create_backend(args.backend, args)
+    else:
         try:
-            from playback.midi_backend import MidiPlaybackBackend
-            playback_backend = MidiPlaybackBackend(port_name=args.midi_port, instrument=args.midi_instrument)
+            playback_backend = create_backend(args.backend, args)
         except ImportError as e:
-            print(f"Error importing MidiPlaybackBackend: {e}", file=sys.stderr)
-            print("Please ensure python-rtmidi is installed ('pip install python-rtmidi'). Falling back to pynput.", file=sys.stderr)
-            playback_backend = PynputKeyboardBackend() # Fallback
+            backend_class, package = BACKENDS[args.backend][1:3]
+            print(f"Error importing {backend_class}: {e}", file=sys.stderr)
+            print(f"Please ensure {package} is installed ('pip install {package}'). Falling back to {FALLBACK_BACKEND}.", file=sys.stderr)
+            playback_backend = create_backend(FALLBACK_BACKEND, args) # Fallback
         except Exception as e:
-            print(f"Error initializing MidiPlaybackBackend: {e}", file=sys.stderr)
-            print("Falling back to pynput backend.", file=sys.stderr)
-            playback_backend = PynputKeyboardBackend() # Fallback
-    else: 
-        # Should not happen due to argparse choices, but safety first
-        print(f"Error: Unknown backend '{args.backend}'. Using pynput.", file=sys.stderr)
-        playback_backend = PynputKeyboardBackend()
+            print(f"Error initializing {BACKENDS[args.backend][1]}: {e}", file=sys.stderr)
+            print(f"Falling back to {FALLBACK_BACKEND} backend.", file=sys.stderr)
+            playback_backend = create_backend(FALLBACK_BACKEND, args) # Fallback
+
+    # music21 (through player and score) is only imported now, once arguments and backend are settled
+    from player import Player
+    from score import scan_scores_cached
+
+    # Determine actual scores directory and get absolute path
+    scores_dir = args.directory
+    abs_scores_dir = os.path.abspath(scores_dir)
+    print(f"Using scores directory: {abs_scores_dir}")
+    
+    # Scan for scores initially using the specified directory (cached between runs)
+    discovered_scores = scan_scores_cached(scores_dir)
 
     # Initialize Player Controller
     player = Player(backend=playback_backend,
                     scores=discovered_scores,
                     mode=args.mode,
                     tolerance=args.tolerance)
+    if args.warm_cache:
+        player.warm_prepared_cache()
 
     # Initialize Hotkey Listener
     listener = HotkeyListener(player=player)
@@ -140,11 +171,12 @@ def main():
         print(f" Discovered {len(discovered_scores)} scores.")
     else:
         print("  No scores found.")
-    print(f"  {PREV_SCORE_HOTKEY_COMBINATION} / {NEXT_SCORE_HOTKEY_COMBINATION} : Previous / Next track")
-    print(f"  {START_HOTKEY_COMBINATION} : Start playback / Resume if paused")
-    print(f"  {STOP_HOTKEY_COMBINATION} : Stop playback")
-    print(f"  {PAUSE_RESUME_HOTKEY_COMBINATION} : Pause / Resume playback")
-    print(f"  {EXIT_HOTKEY_COMBINATION} : Exit application")
+    print(f"  {hotkey_string(PREV_SCORE_HOTKEY_COMBINATION)} / {hotkey_string(NEXT_SCORE_HOTKEY_COMBINATION)} : Previous / Next track")
+    print(f"  {hotkey_string(START_HOTKEY_COMBINATION)} : Start playback / Resume if paused")
+    print(f"  {hotkey_string(STOP_HOTKEY_COMBINATION)} : Stop playback")
+    print(f"  {hotkey_string(PAUSE_RESUME_HOTKEY_COMBINATION)} : Pause / Resume playback")
+    print(f"  {hotkey_string(NUDGE_EARLIER_HOTKEY_COMBINATION)} / {hotkey_string(NUDGE_LATER_HOTKEY_COMBINATION)} : Nudge timing earlier / later")
+    print(f"  {hotkey_string(EXIT_HOTKEY_COMBINATION)} : Exit application")
     print("----------------")
 
     # --- Start Listening ---
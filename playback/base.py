@@ -1,16 +1,73 @@
 import abc
+import os
 import sys
+from collections.abc import Collection, Sequence
+from typing import NamedTuple
+
+SHARP_NOTE_NAMES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+
+
+def midi_note_name(midi_note: int) -> str:
+    """Sharp-spelled note name with octave for a MIDI number, e.g. 61 -> 'C#4'."""
+    return f"{SHARP_NOTE_NAMES[midi_note % 12]}{midi_note // 12 - 1}"
+
+
+# Kinds of playback events, shared by the Player's schedule and ScheduledEvent
+EVENT_NOTE = 0
+EVENT_CHORD = 1
+EVENT_REST = 2
+
+
+def raise_thread_priority():
+    """Best-effort real-time priority for the calling (timing-critical) thread.
+
+    Uses SCHED_FIFO on Linux and THREAD_PRIORITY_TIME_CRITICAL on Windows. Silently
+    keeps the default priority when the platform or permissions don't allow it.
+    """
+    try:
+        if sys.platform.startswith('linux'):
+            # On Linux, pid 0 with sched_setscheduler targets the calling thread only
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(20))
+        elif sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 15) # THREAD_PRIORITY_TIME_CRITICAL
+    except (OSError, AttributeError):
+        pass # Not permitted (e.g. no CAP_SYS_NICE) or unsupported: keep default priority
+
+
+def reset_thread_priority():
+    """Returns the calling thread to normal scheduling after raise_thread_priority()."""
+    try:
+        if sys.platform.startswith('linux'):
+            os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+        elif sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 0) # THREAD_PRIORITY_NORMAL
+    except (OSError, AttributeError):
+        pass
+
+
+class ScheduledEvent(NamedTuple):
+    """A play call for the backend to issue itself at an absolute time.perf_counter() time."""
+    at: float
+    kind: int                   # EVENT_NOTE / EVENT_CHORD / EVENT_REST
+    midi_notes: tuple           # (midi,) for a note, all MIDI numbers of a chord, () for a rest
+    duration_sec: float
+    apply_octave_shift: bool
+    volume: float
+    tied: object                # Note: is_tie_continuation; chord: tied_midi_notes; rest: None
 
-try:
-    from music21 import pitch
-except ImportError:
-    print("Error: music21 library not found.", file=sys.stderr)
-    print("Please install it using: pip install music21", file=sys.stderr)
-    sys.exit(1)
 
 class PlaybackBackend(abc.ABC):
     """Abstract base class for different playback mechanisms."""
 
+    # Key into config.BACKEND_MIDI_RANGES and BACKEND_LATENCIES, set by each backend
+    name: str | None = None
+    # Backends that can time events themselves set this and implement schedule_events()
+    supports_scheduling = False
+
     @abc.abstractmethod
     def start(self):
         """Initialize the backend (if necessary)."""
@@ -22,11 +79,11 @@ class PlaybackBackend(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def play_note(self, note_pitch: pitch.Pitch, duration_sec: float, apply_octave_shift: bool, volume: float, is_tie_continuation: bool = False):
+    def play_note(self, midi_note: int, duration_sec: float, apply_octave_shift: bool, volume: float, is_tie_continuation: bool = False):
         """Play a single note.
 
         Args:
-            note_pitch: The music21 pitch object to play.
+            midi_note: The MIDI note number to play.
             duration_sec: The duration to hold the note (backend specific interpretation).
             apply_octave_shift: Whether the backend should attempt to shift the octave
                                 if the pitch is outside its ideal range.
@@ -37,16 +94,16 @@ class PlaybackBackend(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def play_chord(self, chord_pitches: list[pitch.Pitch], duration_sec: float, apply_octave_shift: bool, volume: float, tied_pitches: list[pitch.Pitch] = None):
+    def play_chord(self, chord_midi_notes: Sequence[int], duration_sec: float, apply_octave_shift: bool, volume: float, tied_midi_notes: Collection[int] | None = None):
         """Play a chord (multiple notes simultaneously).
 
         Args:
-            chord_pitches: A list of music21 pitch objects in the chord.
+            chord_midi_notes: The MIDI note numbers in the chord.
             duration_sec: The duration to hold the chord (backend specific interpretation).
             apply_octave_shift: Whether the backend should attempt to shift the octave
                                 for pitches outside its ideal range.
             volume: The volume level (0.0 to 1.0).
-            tied_pitches: List of pitches in the chord that are tied from a previous note/chord.
+            tied_midi_notes: MIDI numbers in the chord that are tied from a previous note/chord.
                           Backends may choose not to retrigger these notes.
         """
         pass
@@ -54,4 +111,12 @@ class PlaybackBackend(abc.ABC):
     @abc.abstractmethod
     def rest(self, duration_sec: float):
         """Pause for a specified duration (rest)."""
-        pass 
\ No newline at end of file
+        pass 
+
+    def schedule_events(self, events: Sequence[ScheduledEvent]):
+        """Queue events to be played at their absolute times (only if supports_scheduling)."""
+        raise NotImplementedError(f"{type(self).__name__} does not support scheduled playback")
+
+    def cancel_scheduled(self):
+        """Drop queued events that have not been played yet; notes already sounding end normally."""
+        pass
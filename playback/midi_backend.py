@@ -1,35 +1,57 @@
+import heapq
+import logging
+import select
+import socket
 import sys
 import threading
+import time
 
-try:
-    import rtmidi
-    # 定义MidiOut别名以避免linter警告 (如果rtmidi.MidiOut确实存在)
-    if hasattr(rtmidi, 'MidiOut'):
-        RtMidiOut = rtmidi.MidiOut
-    else:
-        # 旧版本rtmidi可能使用不同的名称
-        RtMidiOut = getattr(rtmidi, 'RtMidiOut', None)
-        if RtMidiOut is None:
-            print("Error: Could not find MidiOut class in rtmidi module.", file=sys.stderr)
-            sys.exit(1)
-except ImportError:
-    print("Error: rtmidi library not found.", file=sys.stderr)
-    print("Please install it using: pip install python-rtmidi", file=sys.stderr)
-    sys.exit(1)
-
-try:
-    from music21 import pitch
-except ImportError:
-    print("Error: music21 library not found.", file=sys.stderr)
-    print("Please install it using: pip install music21", file=sys.stderr)
-    sys.exit(1)
-
-from playback.base import PlaybackBackend
+# 缺少依赖时抛出ImportError（而不是退出进程），main.py据此回退到其他后端
+import rtmidi
+# 定义MidiOut别名以避免linter警告 (如果rtmidi.MidiOut确实存在)
+if hasattr(rtmidi, 'MidiOut'):
+    RtMidiOut = rtmidi.MidiOut
+else:
+    # 旧版本rtmidi可能使用不同的名称
+    RtMidiOut = getattr(rtmidi, 'RtMidiOut', None)
+    if RtMidiOut is None:
+        raise ImportError("Could not find MidiOut class in rtmidi module")
+
+from playback.base import (
+    EVENT_CHORD,
+    EVENT_NOTE,
+    PlaybackBackend,
+    ScheduledEvent,
+    midi_note_name,
+    raise_thread_priority,
+)
+
+log = logging.getLogger(__name__)
+
+# 是否可以创建虚拟MIDI端口：Windows MME不支持，只在导入时判断一次
+VIRTUAL_PORTS_SUPPORTED = sys.platform != 'win32' and hasattr(RtMidiOut, 'open_virtual_port')
+
+# 调度堆与同时发声音符数的上限：MIDI设备卡住时宁可提前释放最旧的音符，也不无限累积
+MAX_PENDING_NOTE_OFFS = 256
+MAX_ACTIVE_VOICES = 32  # 接近真实钢琴的复音数
+
+# 预先构造的note-off消息 (Channel 1)，按MIDI音符编号索引，释放音符时无需再创建列表
+_NOTE_OFF_MESSAGES = tuple((0x80, midi_note, 0) for midi_note in range(128))
+
+
+def _velocity_from_volume(volume: float) -> int:
+    """音量 (0.0 到 1.0) 转换为MIDI速度值，并限制在0-127范围内"""
+    velocity = int(volume * 127)
+    return 0 if velocity < 0 else 127 if velocity > 127 else velocity
 
 
 class MidiPlaybackBackend(PlaybackBackend):
     """用MIDI设备播放音符的后端，提供精确的音符持续时间控制"""
 
+    name = 'midi'
+    # 调度线程可以按绝对时间发送note-on，播放器可以提前批量提交事件
+    supports_scheduling = True
+
     def __init__(self, port_name=None, instrument=0):
         """初始化MIDI后端
         
@@ -44,72 +66,161 @@ class MidiPlaybackBackend(PlaybackBackend):
         self.instrument = instrument  # 存储乐器程序号
         self.is_initialized = False
         
-        # 跟踪当前活跃的音符
-        self.active_notes = {}  # 键：pitch.nameWithOctave，值：{'midi_note': int, 'timer': Timer}
+        # 跟踪当前活跃的音符: 以MIDI音符编号为下标的128个槽位
+        # 值为该音符当前note-off安排的generation，None表示未在播放
+        self.active_notes: list[int | None] = [None] * 128
+        self._active_count = 0  # active_notes中非None槽位的数量
+
+        # 复用的note-on消息缓冲区 (Channel 1)：只修改音符和速度字节，不再每个音符新建列表
+        # (rtmidi在send_message调用中复制消息内容；note-on同一时间只由一个线程发送：
+        #  直接播放时是播放线程，提前提交事件时是调度线程)
+        self._note_on_msg = bytearray(b'\x90\x00\x00')
+
+        # 单一调度线程负责所有note-off（以及提前提交的播放事件），代替每个音符一个Timer线程
+        # 堆元素: (deadline, generation, midi_notes, event)，同一和弦的所有音符共用一个元素
+        # note-off元素的event为None；播放事件元素的midi_notes为空，event为ScheduledEvent
+        # 延长音符时分配新的generation，旧的堆元素在弹出时因generation不匹配而被忽略
+        self._sched_heap = []
+        self._sched_lock = threading.RLock()  # 保护 _sched_heap 和 active_notes
+        # 调度线程用select()等待截止时间，新的更早截止时间通过向socketpair写入一个字节唤醒它
+        # (用socketpair而非os.pipe，因为Windows上select()只支持socket)
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._next_generation = 0
+        self._sched_thread: threading.Thread | None = None
+        self._sched_running = False
+        self._warned_uninitialized = False # schedule_events的未初始化警告只打印一次
         
+        # 缓存可用MIDI端口列表（某些ALSA环境下get_ports()较慢），start()直接复用
+        self._available_ports: list[str] = self.midi_out.get_ports()
+        # 已解析的端口下标，重新start()时直接复用；None表示尚未解析或使用虚拟端口
+        self._resolved_port_index: int | None = None
+        # 打开端口可能阻塞数十毫秒，start()在后台线程中完成
+        self._open_thread: threading.Thread | None = None
+
         # 打印可用MIDI端口作为参考
-        available_ports = self.midi_out.get_ports()
+        available_ports = self._available_ports
         if available_ports:
             print(f"可用MIDI端口: {available_ports}")
-        else:
+        elif VIRTUAL_PORTS_SUPPORTED:
             print("未找到MIDI设备，将创建虚拟MIDI端口")
+        else:
+            print("未找到MIDI设备，且当前平台不支持虚拟MIDI端口", file=sys.stderr)
         
         print("MidiPlaybackBackend创建完成。使用start()初始化MIDI连接。")
 
     def start(self):
-        """初始化MIDI连接"""
-        if self.is_initialized:
+        """在后台线程中初始化MIDI连接，不阻塞调用方"""
+        if self.is_initialized or self.is_opening:
             return
-            
+        self._open_thread = threading.Thread(target=self._open_connection, daemon=True)
+        self._open_thread.start()
+
+    @property
+    def is_opening(self) -> bool:
+        """MIDI端口是否仍在后台打开中"""
+        return self._open_thread is not None and self._open_thread.is_alive()
+
+    def _open_virtual_port(self, name: str) -> bool:
+        """创建虚拟端口；平台不支持时返回False"""
+        if not VIRTUAL_PORTS_SUPPORTED:
+            print(f"无法创建虚拟MIDI端口 '{name}': 当前平台不支持，请连接MIDI设备或使用其他后端", file=sys.stderr)
+            return False
+        self.midi_out.open_virtual_port(name)
+        return True
+
+    def _open_connection(self):
+        """打开MIDI端口、设置乐器并启动调度线程（在start()创建的后台线程中运行）"""
         try:
+            reconnected = False
+            if self._resolved_port_index is not None:
+                # 重新连接：复用上次解析到的端口；失败时（设备已拔出等）重新获取端口列表再解析
+                try:
+                    self.midi_out.open_port(self._resolved_port_index)
+                    print(f"已连接到MIDI端口: {self._available_ports[self._resolved_port_index]}")
+                    reconnected = True
+                except Exception as e:
+                    print(f"重新连接MIDI端口失败: {e}，重新获取端口列表")
+                    self.refresh_ports()
+
             # 尝试打开特定端口或第一个可用端口
-            available_ports = self.midi_out.get_ports()
+            available_ports = self._available_ports
             
-            if self.port_name:
+            if reconnected:
+                pass # 已复用上次的端口
+            elif self.port_name:
                 # 尝试找到指定名称的端口
+                wanted = self.port_name.lower()
                 for i, port in enumerate(available_ports):
-                    if self.port_name.lower() in port.lower():
+                    if wanted in port.lower():
                         self.midi_out.open_port(i)
+                        self._resolved_port_index = i
                         print(f"已连接到MIDI端口: {port}")
                         break
                 else:
                     # 没找到指定端口，创建虚拟端口
                     print(f"未找到名为 '{self.port_name}' 的MIDI端口，创建虚拟端口")
-                    self.midi_out.open_virtual_port(f"Piano Player - {self.port_name}")
+                    if not self._open_virtual_port(f"Piano Player - {self.port_name}"):
+                        return
             elif available_ports:
                 # 使用第一个可用端口
                 self.midi_out.open_port(0)
+                self._resolved_port_index = 0
                 print(f"已连接到MIDI端口: {available_ports[0]}")
             else:
                 # 没有可用端口，创建虚拟端口
-                self.midi_out.open_virtual_port("Piano Player")
+                if not self._open_virtual_port("Piano Player"):
+                    return
                 print("已创建虚拟MIDI端口: Piano Player")
             
             # 端口连接后，发送Program Change消息设置乐器
             self._set_instrument(self.instrument)
+
+            # 启动note-off调度线程
+            self._sched_running = True
+            self._sched_thread = threading.Thread(target=self._scheduler_loop, daemon=True)
+            self._sched_thread.start()
                 
             self.is_initialized = True
+            self._warned_uninitialized = False
             
         except Exception as e:
             print(f"初始化MIDI连接时出错: {e}", file=sys.stderr)
             print("MIDI播放可能失败。", file=sys.stderr)
             
+    def refresh_ports(self):
+        """重新获取MIDI端口列表，并使缓存的端口下标失效（设备插拔后调用）"""
+        self._available_ports = self.midi_out.get_ports()
+        self._resolved_port_index = None
+
     def stop(self):
         """停止所有音符并关闭MIDI连接"""
+        # 如果端口仍在打开中，等待其完成后再关闭
+        if self._open_thread is not None:
+            self._open_thread.join(timeout=2.0)
+            self._open_thread = None
         if not self.is_initialized:
             return
             
         try:
-            # 发送所有音符的note-off消息
-            for note_id, note_info in list(self.active_notes.items()):
-                midi_note = note_info['midi_note']
-                self._send_note_off(note_id, midi_note)
-                # 取消所有定时器
-                if 'timer' in note_info and note_info['timer'] is not None:
-                    note_info['timer'].cancel()
-                    
-            # 清空活跃音符字典
-            self.active_notes.clear()
+            # 停止调度线程并丢弃所有待发送的note-off，同时换出活跃音符表
+            with self._sched_lock:
+                self._sched_running = False
+                self._sched_heap.clear()
+                notes = self.active_notes
+                self.active_notes = [None] * 128
+                self._active_count = 0
+            self._wake_scheduler()
+            if self._sched_thread is not None:
+                self._sched_thread.join(timeout=1.0)
+                self._sched_thread = None
+
+            # 直接发送note-off（换出的表无需再逐个清理）
+            send = self.midi_out.send_message
+            for midi_note, generation in enumerate(notes):
+                if generation is not None:
+                    send(_NOTE_OFF_MESSAGES[midi_note])
             
             # 发送全部音符关闭消息 (MIDI CC 123)
             self.midi_out.send_message([0xB0, 123, 0])
@@ -122,178 +233,264 @@ class MidiPlaybackBackend(PlaybackBackend):
         except Exception as e:
             print(f"关闭MIDI连接时出错: {e}", file=sys.stderr)
 
-    def play_note(self, note_pitch: pitch.Pitch, duration_sec: float, apply_octave_shift: bool, volume: float, is_tie_continuation: bool = False):
+    def play_note(self, midi_note: int, duration_sec: float, apply_octave_shift: bool, volume: float, is_tie_continuation: bool = False):
         """播放单个音符
         
         Args:
-            note_pitch: music21音高对象
+            midi_note: MIDI音符编号
             duration_sec: 持续时间（秒）
             apply_octave_shift: 是否应用八度移位（MIDI后端支持完整MIDI范围，通常不需要）
             volume: 音量 (0.0 到 1.0)
             is_tie_continuation: 是否是连音符的延续部分（MIDI后端会自动延长音符，无需重触发）
         """
         if not self.is_initialized:
-            print("警告: MIDI后端未初始化，无法播放音符。", file=sys.stderr)
+            if self.is_opening:
+                log.debug("MIDI端口仍在打开中，跳过音符。")
+            else:
+                log.warning("MIDI后端未初始化，无法播放音符。")
             return
             
-        # 获取MIDI音符编号
-        midi_note = note_pitch.midi
-        note_id = note_pitch.nameWithOctave
-        
         # 对于tie续音，MIDI最大的优势是可以自然延长前一个音符而不重触发
         # 检查该音符是否已在播放
-        if is_tie_continuation and note_id in self.active_notes:
-            # 取消之前设置的note-off定时器
-            if 'timer' in self.active_notes[note_id] and self.active_notes[note_id]['timer'] is not None:
-                self.active_notes[note_id]['timer'].cancel()
-            
-            # 创建新的定时器，继续播放相同时长
-            timer = threading.Timer(duration_sec, self._send_note_off, args=[note_id, midi_note])
-            timer.daemon = True
-            timer.start()
-            
-            # 更新活跃音符信息
-            self.active_notes[note_id]['timer'] = timer
-            print(f"MIDI延长音符: {note_id} (延长 {duration_sec:.2f}秒)")
+        if is_tie_continuation and self.active_notes[midi_note] is not None:
+            # 重新安排note-off，继续播放相同时长
+            self._schedule_note_off((midi_note,), duration_sec)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("MIDI延长音符: %s (延长 %.2f秒)", midi_note_name(midi_note), duration_sec)
             return
             
         # 如果有octave shift，应用它（通常MIDI不需要，但保留此功能以兼容接口）
-        if apply_octave_shift and hasattr(note_pitch, 'transpose'):
+        if apply_octave_shift:
             # 计算偏移量（如果有）
             # 此处无实际操作，因为MIDI支持全范围
             pass
             
         # 计算速度值（音量），MIDI范围是0-127
-        velocity = int(volume * 127)
+        velocity = _velocity_from_volume(volume)
         
-        # 如果此音符已在播放，先停止它
-        if note_id in self.active_notes:
-            # 取消现有的定时器
-            if 'timer' in self.active_notes[note_id] and self.active_notes[note_id]['timer'] is not None:
-                self.active_notes[note_id]['timer'].cancel()
-                
-            # 发送note-off（不总是必要的，但为安全起见）
-            self._send_note_off(note_id, self.active_notes[note_id]['midi_note'])
+        # 如果此音符已在播放，先停止它（不总是必要的，但为安全起见）
+        if self.active_notes[midi_note] is not None:
+            self._send_note_off(midi_note)
         
         # 发送note-on消息
-        self.midi_out.send_message([0x90, midi_note, velocity])  # Channel 1 note-on
-        print(f"MIDI播放音符: {note_id} (MIDI: {midi_note}, 音量: {velocity})")
-        
-        # 设置定时器，在适当时间发送note-off
-        timer = threading.Timer(duration_sec, self._send_note_off, args=[note_id, midi_note])
-        timer.daemon = True
-        timer.start()
+        msg = self._note_on_msg
+        msg[1] = midi_note
+        msg[2] = velocity
+        self.midi_out.send_message(msg)  # Channel 1 note-on
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("MIDI播放音符: %s (MIDI: %s, 音量: %s)", midi_note_name(midi_note), midi_note, velocity)
         
-        # 记录活跃音符
-        self.active_notes[note_id] = {
-            'midi_note': midi_note,
-            'timer': timer
-        }
+        # 安排在适当时间发送note-off，并记录活跃音符
+        self._schedule_note_off((midi_note,), duration_sec)
 
-    def play_chord(self, chord_pitches: list[pitch.Pitch], duration_sec: float, apply_octave_shift: bool, volume: float, tied_pitches: list[pitch.Pitch] = None):
+    def play_chord(self, chord_midi_notes: tuple[int, ...], duration_sec: float, apply_octave_shift: bool, volume: float, tied_midi_notes=None):
         """播放和弦（多个音符同时）
         
         Args:
-            chord_pitches: 和弦中音高对象的列表
+            chord_midi_notes: 和弦中MIDI音符编号的序列
             duration_sec: 持续时间（秒）
             apply_octave_shift: 是否应用八度移位
             volume: 音量 (0.0 到 1.0)
-            tied_pitches: 从前一个音符/和弦延续的音符列表
+            tied_midi_notes: 从前一个音符/和弦延续的MIDI音符编号
         """
         if not self.is_initialized:
-            print("警告: MIDI后端未初始化，无法播放和弦。", file=sys.stderr)
+            if self.is_opening:
+                log.debug("MIDI端口仍在打开中，跳过和弦。")
+            else:
+                log.warning("MIDI后端未初始化，无法播放和弦。")
             return
         
-        # 创建tied音符集合，用于快速查找
-        tied_note_names = set()
-        if tied_pitches:
-            tied_note_names = {p.nameWithOctave for p in tied_pitches}
+        # 没有tie续音时使用空元组，便于统一用 in 判断
+        if not tied_midi_notes:
+            tied_midi_notes = ()
             
         # 计算速度值（音量）
-        velocity = int(volume * 127)
+        velocity = _velocity_from_volume(volume)
         
-        # 记录和弦中的音符ID
-        chord_note_ids = []
-        tied_notes = []
-        new_notes = []
+        new_midi_notes = []
+        extended_midi_notes = []
         
         # 遍历和弦中的每个音符
-        for p in chord_pitches:
-            note_id = p.nameWithOctave
-            chord_note_ids.append(note_id)
-            midi_note = p.midi
-            
+        for midi_note in chord_midi_notes:
             # 检查是否是tie续音
-            if note_id in tied_note_names:
-                tied_notes.append(note_id)
-                
-                # 延长已有音符的定时器
-                if note_id in self.active_notes:
-                    # 取消现有的定时器
-                    if 'timer' in self.active_notes[note_id] and self.active_notes[note_id]['timer'] is not None:
-                        self.active_notes[note_id]['timer'].cancel()
-                    
-                    # 创建新的定时器
-                    timer = threading.Timer(duration_sec, self._send_note_off, args=[note_id, midi_note])
-                    timer.daemon = True
-                    timer.start()
-                    
-                    # 更新活跃音符信息
-                    self.active_notes[note_id]['timer'] = timer
+            if midi_note in tied_midi_notes:
+                # 延长已有音符：稍后与其他延长音符一起重新安排note-off
+                if self.active_notes[midi_note] is not None:
+                    extended_midi_notes.append(midi_note)
                     
                 continue  # 跳过新音符的触发
             
             # 以下是非tie音符的处理
-            new_notes.append(note_id)
-            
-            # 如果此音符已在播放，先停止它
-            if note_id in self.active_notes:
-                # 取消现有的定时器
-                if 'timer' in self.active_notes[note_id] and self.active_notes[note_id]['timer'] is not None:
-                    self.active_notes[note_id]['timer'].cancel()
-                
-                # 发送note-off（不总是必要的，但为安全起见）
-                self._send_note_off(note_id, self.active_notes[note_id]['midi_note'])
+            new_midi_notes.append(midi_note)
             
-            # 发送note-on消息
-            self.midi_out.send_message([0x90, midi_note, velocity])  # Channel 1 note-on
-            
-            # 设置定时器
-            timer = threading.Timer(duration_sec, self._send_note_off, args=[note_id, midi_note])
-            timer.daemon = True
-            timer.start()
-            
-            # 记录活跃音符
-            self.active_notes[note_id] = {
-                'midi_note': midi_note,
-                'timer': timer
-            }
+            # 如果此音符已在播放，先停止它（不总是必要的，但为安全起见）
+            if self.active_notes[midi_note] is not None:
+                self._send_note_off(midi_note)
+        
+        # 所有新音符的note-on连续发送，使和弦尽量同时发声
+        # (rtmidi每次只接受一条非SysEx消息，无法合并成一个send_message调用)
+        send = self.midi_out.send_message
+        msg = self._note_on_msg
+        msg[2] = velocity
+        for midi_note in new_midi_notes:
+            msg[1] = midi_note
+            send(msg)  # Channel 1 note-on
+        
+        # 整个和弦只安排一次note-off，到期时所有音符一起释放
+        if new_midi_notes:
+            self._schedule_note_off(tuple(new_midi_notes), duration_sec)
+        if extended_midi_notes:
+            self._schedule_note_off(tuple(extended_midi_notes), duration_sec)
         
-        # 打印和弦信息
-        if new_notes:
-            print(f"MIDI播放和弦: {' | '.join(new_notes)}")
-        if tied_notes:
-            print(f"MIDI延长和弦音符: {' | '.join(tied_notes)}")
-        if not new_notes and not tied_notes:
-            print("MIDI和弦: 无有效音符")
+        # 记录和弦信息（仅在DEBUG级别时计算音符名称）
+        if log.isEnabledFor(logging.DEBUG):
+            new_notes = [midi_note_name(n) for n in chord_midi_notes if n not in tied_midi_notes]
+            tied_notes = [midi_note_name(n) for n in chord_midi_notes if n in tied_midi_notes]
+            if new_notes:
+                log.debug("MIDI播放和弦: %s", ' | '.join(new_notes))
+            if tied_notes:
+                log.debug("MIDI延长和弦音符: %s", ' | '.join(tied_notes))
+            if not new_notes and not tied_notes:
+                log.debug("MIDI和弦: 无有效音符")
 
     def rest(self, duration_sec: float):
         """暂停指定时间（休止符）"""
         # 休止符不需要发送MIDI消息，只需等待
-        print(f"MIDI休止符: {duration_sec:.3f}秒")
+        log.debug("MIDI休止符: %.3f秒", duration_sec)
         
-    def _send_note_off(self, note_id: str, midi_note: int):
+    def _schedule_note_off(self, midi_notes: tuple[int, ...], duration_sec: float):
+        """记录活跃音符，并安排在duration_sec秒后一起发送note-off（替换这些音符之前的安排）"""
+        with self._sched_lock:
+            self._next_generation += 1
+            generation = self._next_generation
+            for midi_note in midi_notes:
+                if self.active_notes[midi_note] is None:
+                    self._active_count += 1
+                self.active_notes[midi_note] = generation
+            # 超过复音上限时释放最早安排的音符（generation最小者）
+            while self._active_count > MAX_ACTIVE_VOICES:
+                victim = min((g, n) for n, g in enumerate(self.active_notes) if g is not None)[1]
+                self._send_note_off(victim)
+            # 堆已满时先清除已失效的元素（被延长/重新触发的音符留下的），
+            # note-off仍然满时提前释放截止时间最早的note-off；
+            # 预先提交的播放事件（e[3]不为None）不计入上限，也不会被提前播放
+            if len(self._sched_heap) >= MAX_PENDING_NOTE_OFFS:
+                active = self.active_notes
+                self._sched_heap = [e for e in self._sched_heap
+                                    if e[3] is not None or any(active[n] == e[1] for n in e[2])]
+                note_offs = [e for e in self._sched_heap if e[3] is None]
+                earliest = min(note_offs) if len(note_offs) >= MAX_PENDING_NOTE_OFFS else None
+                if earliest is not None:
+                    self._sched_heap.remove(earliest)
+                heapq.heapify(self._sched_heap)
+                if earliest is not None:
+                    self._fire_entry(earliest)
+            entry = (time.perf_counter() + duration_sec, generation, midi_notes, None)
+            heapq.heappush(self._sched_heap, entry)
+            # 只有新的元素成为最早截止时间时才需要唤醒调度线程
+            if self._sched_heap[0] is entry:
+                self._wake_scheduler()
+
+    def schedule_events(self, events):
+        """提前提交播放事件，由调度线程在各事件的绝对时间 (time.perf_counter()) 播放
+
+        端口未打开时没有调度线程，事件直接丢弃（与play_note一致），避免堆无限增长或打开后集中补发
+        """
+        if not self.is_initialized:
+            if self.is_opening:
+                log.debug("MIDI端口仍在打开中，跳过%d个事件。", len(events))
+            elif not self._warned_uninitialized:
+                self._warned_uninitialized = True
+                log.warning("MIDI后端未初始化，预先提交的事件将被丢弃。")
+            return
+        with self._sched_lock:
+            was_earliest = self._sched_heap[0][0] if self._sched_heap else None
+            for event in events:
+                self._next_generation += 1
+                heapq.heappush(self._sched_heap, (event.at, self._next_generation, (), event))
+            if was_earliest is None or self._sched_heap[0][0] < was_earliest:
+                self._wake_scheduler()
+
+    def cancel_scheduled(self):
+        """丢弃尚未播放的事件；已发声音符的note-off保持不变"""
+        with self._sched_lock:
+            self._sched_heap = [e for e in self._sched_heap if e[3] is None]
+            heapq.heapify(self._sched_heap)
+
+    def _play_event(self, event: ScheduledEvent):
+        """在调度线程中执行一个到期的播放事件"""
+        if event.kind == EVENT_NOTE:
+            self.play_note(event.midi_notes[0], event.duration_sec, event.apply_octave_shift, event.volume, event.tied)
+        elif event.kind == EVENT_CHORD:
+            self.play_chord(event.midi_notes, event.duration_sec, event.apply_octave_shift, event.volume, event.tied)
+        else:
+            self.rest(event.duration_sec)
+
+    def _fire_entry(self, entry):
+        """处理一个已弹出的堆元素：播放事件或发送note-off（调用方持有 _sched_lock）"""
+        _, generation, midi_notes, event = entry
+        if event is None:
+            self._release_notes(generation, midi_notes)
+        else:
+            self._play_event(event)
+
+    def _wake_scheduler(self):
+        """唤醒正在select()中等待的调度线程"""
+        try:
+            self._wakeup_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # 缓冲区已满说明已有未处理的唤醒
+
+    def _scheduler_loop(self):
+        """调度线程：等待最早的截止时间，到期后发送对应的note-off或播放事件
+
+        截止时间基于time.perf_counter()，等待使用select()加超时，
+        比Condition.wait(timeout)的唤醒精度更高，note-off抖动更小。
+        """
+        raise_thread_priority()
+        while True:
+            with self._sched_lock:
+                if not self._sched_running:
+                    return
+                timeout = None
+                if self._sched_heap:
+                    now = time.perf_counter()
+                    timeout = self._sched_heap[0][0] - now
+                    if timeout <= 0:
+                        # 一次性处理所有已到期的元素（例如同一和弦的所有音符）
+                        while self._sched_heap and self._sched_heap[0][0] <= now:
+                            self._fire_entry(heapq.heappop(self._sched_heap))
+                        continue
+            # 在锁外等待：到达截止时间或有更早的音符加入时返回
+            readable, _, _ = select.select([self._wakeup_r], [], [], timeout)
+            if readable:
+                try:
+                    while self._wakeup_r.recv(64):
+                        pass
+                except (BlockingIOError, OSError):
+                    pass
+
+    def _release_notes(self, generation: int, midi_notes: tuple[int, ...]):
+        """为仍属于该generation的音符发送note-off（调用方持有 _sched_lock）"""
+        for midi_note in midi_notes:
+            # 音符被延长或重新触发后generation会改变，此时忽略旧的安排
+            if self.active_notes[midi_note] == generation:
+                self._send_note_off(midi_note)
+
+    def _send_note_off(self, midi_note: int):
         """发送note-off消息并清理活跃音符记录"""
         try:
             # 发送note-off消息
-            self.midi_out.send_message([0x80, midi_note, 0])  # Channel 1 note-off
+            self.midi_out.send_message(_NOTE_OFF_MESSAGES[midi_note])  # Channel 1 note-off
             
             # 从活跃音符中删除
-            if note_id in self.active_notes:
-                del self.active_notes[note_id]
+            with self._sched_lock:
+                if self.active_notes[midi_note] is not None:
+                    self._active_count -= 1
+                    self.active_notes[midi_note] = None
                 
         except Exception as e:
-            print(f"发送MIDI Note-Off消息时出错: {e}", file=sys.stderr)
+            log.error("发送MIDI Note-Off消息时出错: %s", e)
 
     def _set_instrument(self, program_number):
         """设置MIDI乐器音色
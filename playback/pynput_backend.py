@@ -1,38 +1,24 @@
+import logging
 import math
-import re
-import sys
 import time
 
 from pynput import keyboard
 
-try:
-    from music21 import pitch
-except ImportError:
-    print("Error: music21 library not found.", file=sys.stderr)
-    print("Please install it using: pip install music21", file=sys.stderr)
-    sys.exit(1)
-
 from config import (
     ACCIDENTAL_MODIFIERS,
+    BLACK_KEY_SPELLING,
     KEY_MAP,
     KEYBOARD_MAX_MIDI,
     KEYBOARD_MIN_MIDI,
     NOTE_TO_JIANPU_BASE,
 )
-from playback.base import PlaybackBackend
+from playback.base import SHARP_NOTE_NAMES, PlaybackBackend, midi_note_name
 
+log = logging.getLogger(__name__)
 
-def standard_note_to_internal_jianpu(standard_note_name_with_octave):
-    """Translates a music21 pitch name (e.g., 'C4', 'G#5') to internal Jianpu for KEY_MAP.
-       Returns the base Jianpu string (e.g., '1', '5̇', '6̣'). Accidental is handled separately.
-    """
-    # music21 format often is like C#4, G-5 (flat is -)
-    match = re.match(r'([A-G])([#-]?)(\d+)', standard_note_name_with_octave)
-    if not match:
-        return None
-    note_letter, _, octave_str = match.groups() # Accidental handled separately
-    octave = int(octave_str)
 
+def note_to_jianpu(note_letter: str, octave: int) -> str | None:
+    """Returns the internal Jianpu string (e.g. '1', '5̇', '6̣') for a note letter and octave."""
     base_jianpu = NOTE_TO_JIANPU_BASE.get(note_letter)
     if not base_jianpu:
         return None # Should not happen
@@ -46,8 +32,37 @@ def standard_note_to_internal_jianpu(standard_note_name_with_octave):
 
     return f"{base_jianpu}{octave_mark}"
 
+def _build_midi_to_key() -> tuple:
+    """Builds a 128-entry table of MIDI number -> (key char, modifier key) or None.
+
+    Black keys use BLACK_KEY_SPELLING: as sharps, the white key below plus Shift;
+    as flats, the white key above plus Ctrl. Where the preferred key has no
+    mapping (the keyboard's edges), the other spelling is used.
+    """
+    table = [None] * 128
+    for midi_num in range(KEYBOARD_MIN_MIDI, KEYBOARD_MAX_MIDI + 1):
+        name = SHARP_NOTE_NAMES[midi_num % 12]
+        octave = midi_num // 12 - 1
+        if len(name) == 1:
+            spellings = ((name, None),)
+        else:
+            # The white key above a black key is always in the same octave (no B/C pair around one)
+            spellings = ((name[0], '#'), (SHARP_NOTE_NAMES[midi_num % 12 + 1], '-'))
+            if BLACK_KEY_SPELLING == '-':
+                spellings = spellings[::-1]
+        for letter, accidental in spellings:
+            key_char = KEY_MAP.get(note_to_jianpu(letter, octave))
+            if key_char:
+                table[midi_num] = (key_char, ACCIDENTAL_MODIFIERS.get(accidental))
+                break
+    return tuple(table)
+
+MIDI_TO_KEY = _build_midi_to_key()
+
 class PynputKeyboardBackend(PlaybackBackend):
     """Playback backend using pynput to simulate global keyboard presses."""
+    name = 'pynput'
+
     def __init__(self):
         self.keyboard_controller = keyboard.Controller()
         print("Initialized PynputKeyboardBackend")
@@ -60,42 +75,37 @@ class PynputKeyboardBackend(PlaybackBackend):
         # No specific stop action needed, but could release held keys if tracked
         pass
 
-    def _get_key_and_modifier(self, note_pitch: pitch.Pitch, apply_octave_shift: bool):
-        """Calculates the target key character and modifier key for a given pitch."""
-        original_pitch = note_pitch
-        adjusted_pitch = note_pitch
-        shift_applied = ""
+    def _get_key_and_modifier(self, midi_note: int, apply_octave_shift: bool):
+        """Calculates the target key character and modifier key for a given MIDI note.
+
+        Returns (key char, modifier key, octave shift in semitones); the key is None if unmapped.
+        """
+        midi_num = midi_note
+        shift_amount = 0
 
         if apply_octave_shift:
-            if adjusted_pitch.midi < KEYBOARD_MIN_MIDI:
-                shift_amount = 12 * math.ceil((KEYBOARD_MIN_MIDI - adjusted_pitch.midi) / 12.0)
-                adjusted_pitch = adjusted_pitch.transpose(shift_amount)
-                shift_applied = f" (Shifted +{shift_amount})"
-            elif adjusted_pitch.midi > KEYBOARD_MAX_MIDI:
-                shift_amount = -12 * math.ceil((adjusted_pitch.midi - KEYBOARD_MAX_MIDI) / 12.0)
-                adjusted_pitch = adjusted_pitch.transpose(shift_amount)
-                shift_applied = f" (Shifted {shift_amount})"
-
-        standard_note_name = adjusted_pitch.nameWithOctave
-        keymap_jianpu = standard_note_to_internal_jianpu(standard_note_name)
-
-        if not keymap_jianpu:
-            print(f"Warning: Could not map standard note {standard_note_name} to internal Jianpu key.{shift_applied}", file=sys.stderr)
-            return None, None, original_pitch.nameWithOctave, shift_applied
-
-        key_to_press_char = KEY_MAP.get(keymap_jianpu)
-        accidental_symbol = None
-        if '#' in adjusted_pitch.name:
-            accidental_symbol = '#'
-        elif '-' in adjusted_pitch.name:
-            accidental_symbol = '-'
-        modifier_key = ACCIDENTAL_MODIFIERS.get(accidental_symbol)
-
-        if not key_to_press_char:
-            print(f"Warning: No key mapping for Jianpu key: {keymap_jianpu} (from {standard_note_name}).{shift_applied}", file=sys.stderr)
-            return None, None, original_pitch.nameWithOctave, shift_applied
-
-        return key_to_press_char, modifier_key, original_pitch.nameWithOctave, shift_applied
+            if midi_num < KEYBOARD_MIN_MIDI:
+                shift_amount = 12 * math.ceil((KEYBOARD_MIN_MIDI - midi_num) / 12.0)
+            elif midi_num > KEYBOARD_MAX_MIDI:
+                shift_amount = -12 * math.ceil((midi_num - KEYBOARD_MAX_MIDI) / 12.0)
+            midi_num += shift_amount
+
+        key_entry = MIDI_TO_KEY[midi_num] if 0 <= midi_num < len(MIDI_TO_KEY) else None
+
+        if not key_entry:
+            log.warning("No key mapping for %s (MIDI %s).%s", midi_note_name(midi_note), midi_num,
+                        f" (Shifted {shift_amount:+d})" if shift_amount else "")
+            return None, None, shift_amount
+
+        key_to_press_char, modifier_key = key_entry
+        return key_to_press_char, modifier_key, shift_amount
+
+    @staticmethod
+    def _describe_pitch(midi_note: int, shift_amount: int) -> str:
+        """Debug text for a MIDI note and its octave shift, e.g. 'C2 -> C3 (Shifted +12)'."""
+        if not shift_amount:
+            return midi_note_name(midi_note)
+        return f"{midi_note_name(midi_note)} -> {midi_note_name(midi_note + shift_amount)} (Shifted {shift_amount:+d})"
 
     def _press_key_combo(self, key_char: str, modifier_key=None):
         """Simulates pressing a key, potentially with a modifier."""
@@ -110,53 +120,73 @@ class PynputKeyboardBackend(PlaybackBackend):
                 self.keyboard_controller.tap(key_char)
             return True
         except Exception as e:
-            print(f"Error simulating key '{key_char}' (Modifier: {modifier_key}): {e}", file=sys.stderr)
+            log.error("Error simulating key '%s' (Modifier: %s): %s", key_char, modifier_key, e)
+            return False
+
+    def _press_key_batch(self, keys: list[tuple[str, object]]):
+        """Taps several keys as one burst, holding each modifier once for all keys that need it.
+
+        Unmodified keys go first, then each modifier group is pressed, settled once,
+        tapped through and released, so a chord costs one settle delay per modifier
+        rather than two sleeps per key.
+        """
+        groups: dict[object, list[str]] = {}
+        for key_char, modifier_key in keys:
+            groups.setdefault(modifier_key, []).append(key_char)
+        tap = self.keyboard_controller.tap
+        try:
+            for key_char in groups.pop(None, ()):
+                tap(key_char)
+            for modifier_key, key_chars in groups.items():
+                self.keyboard_controller.press(modifier_key)
+                time.sleep(0.01) # Let the modifier register before the first tap
+                try:
+                    for key_char in key_chars:
+                        tap(key_char)
+                finally:
+                    self.keyboard_controller.release(modifier_key)
+            return True
+        except Exception as e:
+            log.error("Error simulating keys %s: %s", keys, e)
             return False
 
-    def play_note(self, note_pitch: pitch.Pitch, duration_sec: float, apply_octave_shift: bool, volume: float, is_tie_continuation: bool = False):
+    def play_note(self, midi_note: int, duration_sec: float, apply_octave_shift: bool, volume: float, is_tie_continuation: bool = False):
         # Volume is ignored for pynput backend
-        key_char, mod_key, orig_name, shift_info = self._get_key_and_modifier(note_pitch, apply_octave_shift)
+        key_char, mod_key, shift_amount = self._get_key_and_modifier(midi_note, apply_octave_shift)
 
         if key_char:
-            log_msg = f"Playing Note: {orig_name}"
-            if shift_info:
-                log_msg += f" -> {note_pitch.transpose(int(shift_info.split(' ')[2].replace('(','').replace(')',''))).nameWithOctave}{shift_info}"
-            log_msg += f" -> Key: '{key_char}', Mod: {mod_key or 'None'}"
-            print(log_msg)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Playing Note: %s -> Key: '%s', Mod: %s",
+                          self._describe_pitch(midi_note, shift_amount), key_char, mod_key or 'None')
             self._press_key_combo(key_char, mod_key)
         # Duration is handled by the main playback loop
 
-    def play_chord(self, chord_pitches: list[pitch.Pitch], duration_sec: float, apply_octave_shift: bool, volume: float, tied_pitches: list[pitch.Pitch] = None):
+    def play_chord(self, chord_midi_notes: tuple[int, ...], duration_sec: float, apply_octave_shift: bool, volume: float, tied_midi_notes=None):
         # Volume is ignored for pynput backend
         keys_to_press = []
         log_parts = []
-        orig_names = [p.nameWithOctave for p in chord_pitches]
+        debug_enabled = log.isEnabledFor(logging.DEBUG) # Skip building log text otherwise
 
-        for p in chord_pitches:
-            key_char, mod_key, orig_name, shift_info = self._get_key_and_modifier(p, apply_octave_shift)
+        for midi_note in chord_midi_notes:
+            key_char, mod_key, shift_amount = self._get_key_and_modifier(midi_note, apply_octave_shift)
             if key_char:
                 keys_to_press.append((key_char, mod_key))
-                log_part = f"{orig_name}"
-                if shift_info:
-                     log_part += f"->{p.transpose(int(shift_info.split(' ')[2].replace('(','').replace(')',''))).nameWithOctave}{shift_info}"
-                log_part += f"->('{key_char}',{mod_key or 'N'})"
-                log_parts.append(log_part)
-            else:
-                 log_parts.append(f"{orig_name}->(Map Err)")
+                if debug_enabled:
+                    log_parts.append(f"{self._describe_pitch(midi_note, shift_amount)}->('{key_char}',{mod_key or 'N'})")
+            elif debug_enabled:
+                 log_parts.append(f"{midi_note_name(midi_note)}->(Map Err)")
 
         if keys_to_press:
-            print(f"Playing Chord: { ' | '.join(log_parts) }")
-            # Simple sequential tap for chords in this backend
-            # More complex backends might handle true simultaneity
-            for key_char, mod_key in keys_to_press:
-                self._press_key_combo(key_char, mod_key)
-                time.sleep(0.005) # Tiny delay between chord notes
+            if debug_enabled:
+                log.debug("Playing Chord: %s", ' | '.join(log_parts))
+            # Tap the whole chord in one burst instead of key-by-key with sleeps in between
+            self._press_key_batch(keys_to_press)
         else:
-            print(f"Warning: Could not map any notes in chord: {orig_names}", file=sys.stderr)
+            log.warning("Could not map any notes in chord: %s", [midi_note_name(n) for n in chord_midi_notes])
          # Duration is handled by the main playback loop
 
     def rest(self, duration_sec: float):
         # The backend doesn't need to do anything for a rest,
         # the main loop just waits.
-        print(f"Resting for {duration_sec:.3f}s")
+        log.debug("Resting for %.3fs", duration_sec)
         pass 
\ No newline at end of file
@@ -1,21 +1,14 @@
+import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-try:
-    import pygame
-except ImportError:
-    print("Error: pygame library not found.", file=sys.stderr)
-    print("Please install it using: pip install pygame", file=sys.stderr)
-    sys.exit(1)
+# A missing pygame surfaces as ImportError, so main.py can fall back to another backend
+import pygame
 
-try:
-    from music21 import pitch
-except ImportError:
-    print("Error: music21 library not found.", file=sys.stderr)
-    print("Please install it using: pip install music21", file=sys.stderr)
-    sys.exit(1)
+from playback.base import PlaybackBackend, midi_note_name
 
-from playback.base import PlaybackBackend
+log = logging.getLogger(__name__)
 
 # --- Configuration ---
 SAMPLES_DIR = "samples/piano"
@@ -86,12 +79,47 @@ NOTE_SAMPLE_MAP = {
   'G#6': "b86.mp3"
 }
 
+def _build_midi_to_sample_key() -> tuple:
+    """Builds a 128-entry table of MIDI number -> NOTE_SAMPLE_MAP key (or None if no sample).
+
+    Keys are spelled with sharps, so flats and other enharmonic spellings
+    (B-, C-, E#, ...) resolve to the same sample without any pitch arithmetic.
+    """
+    table = [None] * 128
+    for midi in range(128):
+        key = midi_note_name(midi)
+        if key in NOTE_SAMPLE_MAP:
+            table[midi] = key
+    return tuple(table)
+
+MIDI_TO_SAMPLE_KEY = _build_midi_to_sample_key()
+
+# Must be a power of two: pitches map to channels by MIDI number bitmask. The samples span
+# MIDI 36-96, fewer than 64 semitones, so every sampled pitch has a channel of its own and
+# a new note only ever restarts its own pitch, never cuts off a different one still sounding.
+NUM_CHANNELS = 64
+
+
+def _load_sample(file_path: str) -> tuple[pygame.mixer.Sound | None, Exception | None]:
+    """Loads one sample file, returning (sound, None) or (None, error). Runs on a loader thread."""
+    try:
+        # Sound() decodes the whole file to PCM in the mixer's format here,
+        # so play() is just a buffer copy with no per-note MP3 decoding.
+        # pygame releases the GIL while decoding, so several files load in parallel.
+        return pygame.mixer.Sound(file_path), None
+    except Exception as e:
+        return None, e
+
 
 class SamplePlaybackBackend(PlaybackBackend):
     """Playback backend using pygame to play pre-recorded audio samples."""
+    name = 'sample'
 
     def __init__(self):
         self.samples: dict[str, pygame.mixer.Sound | None] = {}
+        # Loaded Sound per MIDI number (None if unmapped/missing), filled in by start()
+        self.samples_by_midi: list[pygame.mixer.Sound | None] = [None] * 128
+        self._channels: list[pygame.mixer.Channel] = []
         self.is_initialized = False
         print("SamplePlaybackBackend created. Call start() to initialize pygame and load samples.")
 
@@ -102,8 +130,10 @@ class SamplePlaybackBackend(PlaybackBackend):
         print("Initializing pygame mixer...")
         try:
             pygame.mixer.init()
-            pygame.mixer.set_num_channels(32) # Increase available channels
-            print("Pygame mixer initialized with 32 channels.")
+            pygame.mixer.set_num_channels(NUM_CHANNELS) # Increase available channels
+            # Each pitch plays on a fixed channel, so play() never has to search for a free one
+            self._channels = [pygame.mixer.Channel(i) for i in range(NUM_CHANNELS)]
+            print(f"Pygame mixer initialized with {NUM_CHANNELS} channels.")
         except Exception as e:
             print(f"Error initializing pygame mixer: {e}", file=sys.stderr)
             print("Sample playback will likely fail.", file=sys.stderr)
@@ -121,19 +151,24 @@ class SamplePlaybackBackend(PlaybackBackend):
              self.is_initialized = True 
              return
 
+        # Decode all existing files in parallel; report results in map order afterwards
+        file_paths = {note_name: os.path.join(SAMPLES_DIR, filename) for note_name, filename in NOTE_SAMPLE_MAP.items()}
+        present = [note_name for note_name, file_path in file_paths.items() if os.path.exists(file_path)]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = dict(zip(present, executor.map(_load_sample, (file_paths[n] for n in present))))
+
         for note_name, filename in NOTE_SAMPLE_MAP.items():
-            file_path = os.path.join(SAMPLES_DIR, filename)
-            if os.path.exists(file_path):
-                try:
-                    sound = pygame.mixer.Sound(file_path)
+            if note_name in results:
+                sound, error = results[note_name]
+                if sound is not None:
                     self.samples[note_name] = sound
                     loaded_count += 1
-                except Exception as e:
-                    print(f"Error loading sample '{filename}' for note '{note_name}': {e}", file=sys.stderr)
+                else:
+                    print(f"Error loading sample '{filename}' for note '{note_name}': {error}", file=sys.stderr)
                     self.samples[note_name] = None # Mark as unloadable
                     error_count += 1
             else:
-                print(f"Warning: Sample file missing for note '{note_name}': '{file_path}'", file=sys.stderr)
+                print(f"Warning: Sample file missing for note '{note_name}': '{file_paths[note_name]}'", file=sys.stderr)
                 self.samples[note_name] = None # Mark as missing
                 missing_count += 1
         
@@ -141,6 +176,8 @@ class SamplePlaybackBackend(PlaybackBackend):
         if loaded_count == 0:
              print("Warning: No samples were loaded successfully. Playback will be silent.", file=sys.stderr)
 
+        # Resolve MIDI number -> Sound once, so playback is a single list index per note
+        self.samples_by_midi = [self.samples.get(key) if key else None for key in MIDI_TO_SAMPLE_KEY]
         self.is_initialized = True
 
     def stop(self):
@@ -157,34 +194,28 @@ class SamplePlaybackBackend(PlaybackBackend):
             print(f"Error stopping pygame mixer: {e}", file=sys.stderr)
         # Don't reset is_initialized here, allow restart?
 
-    def _get_sample_key(self, note_pitch: pitch.Pitch) -> str | None:
-        """Converts a music21 pitch object to the sharp-based key used in our map."""
-        # Start with the standard name
-        note_name = note_pitch.name
-        octave = note_pitch.octave
-
-        # Check if music21 representation uses flat (e.g., 'B-')
-        if '-' in note_name:
-             # Get the enharmonic equivalent that prefers sharps
-             enharmonic_pitch = note_pitch.getEnharmonic()
-             # Check if the enharmonic uses sharp, prefer that if available
-             if '#' in enharmonic_pitch.name:
-                  note_name = enharmonic_pitch.name
-                  octave = enharmonic_pitch.octave # Octave might change too (e.g. Cb -> B)
-             # If enharmonic is natural (e.g. F- -> E), use that
-             elif enharmonic_pitch.accidental is None:
-                  note_name = enharmonic_pitch.name
-                  octave = enharmonic_pitch.octave
-             # Else, stick with original name if enharmonic didn't help (shouldn't happen often)
-
-        # Reconstruct the key format (e.g., "C#4", "A3")
-        map_key = f"{note_name}{octave}"
-        return map_key
-
-
-    def play_note(self, note_pitch: pitch.Pitch, duration_sec: float, apply_octave_shift: bool, volume: float, is_tie_continuation: bool = False):
+    def _get_sound(self, midi: int) -> pygame.mixer.Sound | None:
+        """Returns the loaded Sound for a MIDI number, or None if there is none to play."""
+        if 0 <= midi < 128:
+            return self.samples_by_midi[midi]
+        return None
+
+    def _get_sample_key(self, midi: int) -> str | None:
+        """Converts a MIDI number to the sharp-based key used in our map."""
+        if 0 <= midi < len(MIDI_TO_SAMPLE_KEY):
+            return MIDI_TO_SAMPLE_KEY[midi]
+        return None
+
+
+    def _play_sound(self, sound: pygame.mixer.Sound, midi: int, volume: float):
+        """Plays a sound on the channel reserved for its pitch."""
+        channel = self._channels[midi & (NUM_CHANNELS - 1)]
+        channel.set_volume(volume) # Channel.play() keeps the channel's volume, unlike Sound.play()
+        channel.play(sound)
+
+    def play_note(self, midi: int, duration_sec: float, apply_octave_shift: bool, volume: float, is_tie_continuation: bool = False):
         if not self.is_initialized:
-            print("Warning: Sample backend not initialized. Cannot play note.", file=sys.stderr)
+            log.warning("Sample backend not initialized. Cannot play note.")
             return
             
         # Octave shift is ignored by this backend as we play pre-recorded files
@@ -192,56 +223,60 @@ class SamplePlaybackBackend(PlaybackBackend):
              # Optionally print a warning that shifting is ignored?
              pass 
              
-        sample_key = self._get_sample_key(note_pitch)
-        
+        sound = self._get_sound(midi)
+        if sound:
+            try:
+                if log.isEnabledFor(logging.DEBUG):
+                    sample_key = MIDI_TO_SAMPLE_KEY[midi]
+                    log.debug("Playing Sample: %s -> Key: '%s' -> File: '%s' Vol: %.2f",
+                              midi_note_name(midi), sample_key, NOTE_SAMPLE_MAP.get(sample_key), volume)
+                self._play_sound(sound, midi, volume)
+            except Exception as e:
+                log.error("Error playing sample for key '%s': %s", self._get_sample_key(midi), e)
+            return
+
+        # Nothing to play: work out why, for the warning
+        sample_key = self._get_sample_key(midi)
         if sample_key and sample_key in self.samples:
-            sound = self.samples[sample_key]
-            if sound:
-                try:
-                    print(f"Playing Sample: {note_pitch.nameWithOctave} -> Key: '{sample_key}' -> File: '{NOTE_SAMPLE_MAP.get(sample_key)}' Vol: {volume:.2f}")
-                    sound.set_volume(volume)
-                    sound.play()
-                except Exception as e:
-                    print(f"Error playing sample for key '{sample_key}': {e}", file=sys.stderr)
-            else:
-                # Sample was missing or failed to load
-                print(f"Warning: Sample for '{sample_key}' ({note_pitch.nameWithOctave}) not loaded. Skipping.", file=sys.stderr)
+            # Sample was missing or failed to load
+            log.warning("Sample for '%s' (%s) not loaded. Skipping.", sample_key, midi_note_name(midi))
         else:
-             print(f"Warning: No sample mapping found for pitch '{note_pitch.nameWithOctave}' (Key: '{sample_key}'). Skipping.", file=sys.stderr)
+             log.warning("No sample mapping found for pitch '%s' (Key: '%s'). Skipping.", midi_note_name(midi), sample_key)
         
         # Duration is handled by the main playback loop, not the backend playing the sample.
 
-    def play_chord(self, chord_pitches: list[pitch.Pitch], duration_sec: float, apply_octave_shift: bool, volume: float, tied_pitches: list[pitch.Pitch] = None):
+    def play_chord(self, chord_midi_notes: tuple[int, ...], duration_sec: float, apply_octave_shift: bool, volume: float, tied_midi_notes=None):
         if not self.is_initialized:
-            print("Warning: Sample backend not initialized. Cannot play chord.", file=sys.stderr)
+            log.warning("Sample backend not initialized. Cannot play chord.")
             return
         
         notes_played = []
         notes_skipped = []
-        for p in chord_pitches:
-            sample_key = self._get_sample_key(p)
+        for midi in chord_midi_notes:
+            sound = self._get_sound(midi)
+            if sound:
+                 try:
+                      self._play_sound(sound, midi, volume)
+                      notes_played.append(midi)
+                 except Exception as e:
+                      sample_key = MIDI_TO_SAMPLE_KEY[midi]
+                      log.error("Error playing sample for chord note '%s': %s", sample_key, e)
+                      notes_skipped.append(f"{midi_note_name(midi)} ('{sample_key}', Error)")
+                 continue
+            sample_key = self._get_sample_key(midi)
             if sample_key and sample_key in self.samples:
-                sound = self.samples[sample_key]
-                if sound:
-                     try:
-                          sound.set_volume(volume)
-                          sound.play()
-                          notes_played.append(f"{p.nameWithOctave} ('{sample_key}')")
-                     except Exception as e:
-                          print(f"Error playing sample for chord note '{sample_key}': {e}", file=sys.stderr)
-                          notes_skipped.append(f"{p.nameWithOctave} ('{sample_key}', Error)")
-                else:
-                     notes_skipped.append(f"{p.nameWithOctave} ('{sample_key}', Missing/LoadErr)")
+                 notes_skipped.append(f"{midi_note_name(midi)} ('{sample_key}', Missing/LoadErr)")
             else:
-                 notes_skipped.append(f"{p.nameWithOctave} (Key '{sample_key}' Invalid)")
+                 notes_skipped.append(f"{midi_note_name(midi)} (Key '{sample_key}' Invalid)")
 
-        if notes_played:
-             print(f"Playing Chord Samples: [ { ' | '.join(notes_played) } ]")
+        if notes_played and log.isEnabledFor(logging.DEBUG):
+             log.debug("Playing Chord Samples: [ %s ]",
+                       ' | '.join(f"{midi_note_name(midi)} ('{MIDI_TO_SAMPLE_KEY[midi]}')" for midi in notes_played))
         if notes_skipped:
-             print(f"  Skipped Chord Notes: [ { ' | '.join(notes_skipped) } ]")
+             log.warning("  Skipped Chord Notes: [ %s ]", ' | '.join(notes_skipped))
 
     def rest(self, duration_sec: float):
         # The backend doesn't need to do anything active for a rest,
         # the main loop just waits.
-        print(f"Resting for {duration_sec:.3f}s")
+        log.debug("Resting for %.3fs", duration_sec)
         pass 
\ No newline at end of file
@@ -1,35 +1,252 @@
+import contextlib
+import gc
+import hashlib
+import logging
+import multiprocessing
 import os
+import pickle
 import random
+from array import array
 import sys
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 
 # Attempt to import music21 components used here
 try:
-    from music21 import articulations, chord, dynamics, note, stream, tempo
+    from music21 import articulations, chord, note
 except ImportError:
     print("Error: music21 library not found.", file=sys.stderr)
     print("Please install it using: pip install music21", file=sys.stderr)
     sys.exit(1)
 
-from config import BACKEND_MIDI_RANGES  # Import backend ranges
-from playback.base import PlaybackBackend
-
-# Import specific backends for type checking if needed, avoids circular imports
-from playback.pynput_backend import PynputKeyboardBackend
-from playback.sample_backend import SamplePlaybackBackend
-
-# 导入MIDI后端进行类型检查
-try:
-    from playback.midi_backend import MidiPlaybackBackend
-except ImportError:
-    # 如果导入失败，定义一个占位类型以避免运行时错误
-    class MidiPlaybackBackend:
-        pass
-    print("Warning: MidiPlaybackBackend not available for type checking.", file=sys.stderr)
-    print("This is not an error if you don't use the midi backend.", file=sys.stderr)
-
-from score import load_and_prepare_score
+from config import BACKEND_LATENCIES, BACKEND_MIDI_RANGES, CACHE_DIRECTORY, NUDGE_STEP_SEC  # Import backend ranges
+from playback.base import (
+    EVENT_CHORD,
+    EVENT_NOTE,
+    EVENT_REST,
+    PlaybackBackend,
+    ScheduledEvent,
+    raise_thread_priority,
+    reset_thread_priority,
+)
+
+from score import load_and_prepare_score, write_cache_file
+
+log = logging.getLogger(__name__)
+
+# How far ahead of the playback position events are handed to backends that schedule them
+LOOKAHEAD_SEC = 0.2
+
+
+class Schedule:
+    """Precomputed playback steps of one score, stored as parallel arrays (one entry per step).
+
+    Built once per score so the timing loop never touches music21; the loop just
+    indexes these arrays. start_offsets is the running sum of wait_sec, computed
+    at build time, with a final entry holding the total length.
+    """
+    __slots__ = ('kinds', 'midi_notes', 'tied', 'duration_sec', 'wait_sec', 'start_offsets')
+
+    def __init__(self):
+        self.kinds = array('B')                 # EVENT_NOTE / EVENT_CHORD / EVENT_REST (see playback.base)
+        self.midi_notes: list[tuple] = []       # (midi,) for a note, all MIDI numbers of a chord, () for a rest
+        self.tied: list = []                    # Note: bool (is tie continuation); chord: tuple of tied MIDI numbers; rest: None
+        self.duration_sec = array('d')          # Sounding duration passed to the backend
+        self.wait_sec = array('d')              # Time until the next step (halved for staccato)
+        self.start_offsets = array('d', [0.0])  # Start time of each step from the score start
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def append(self, kind: int, midi_notes: tuple, duration_sec: float, wait_sec: float, tied):
+        self.kinds.append(kind)
+        self.midi_notes.append(midi_notes)
+        self.tied.append(tied)
+        self.duration_sec.append(duration_sec)
+        self.wait_sec.append(wait_sec)
+        self.start_offsets.append(self.start_offsets[-1] + wait_sec)
+
+
+# Articulation class -> fraction of the written duration to wait before the next step
+ARTICULATION_WAIT_FACTORS = (
+    (articulations.Staccato, 0.5),
+)
+
+
+def _wait_factor(element) -> float:
+    """Returns how much of the element's duration passes before the next step starts."""
+    for art in getattr(element, 'articulations', ()):
+        for art_class, factor in ARTICULATION_WAIT_FACTORS:
+            if isinstance(art, art_class):
+                return factor
+    return 1.0
+
+
+def _element_kind(element_class) -> int | None:
+    """Returns the EVENT_* kind for a music21 element class, or None if it isn't played."""
+    if issubclass(element_class, note.Note):
+        return EVENT_NOTE
+    if issubclass(element_class, chord.Chord):
+        return EVENT_CHORD
+    if issubclass(element_class, note.Rest):
+        return EVENT_REST
+    return None
+
+
+def _has_tie_start(element) -> bool:
+    tie = getattr(element, 'tie', None)
+    return bool(tie) and tie.type in ('start', 'continue')
+
+
+def _tie_bit(midi: int) -> int:
+    """Bit of a MIDI number in the tied bitmask; 0 (never tied) for numbers transposed out of 0-127."""
+    return 1 << midi if 0 <= midi <= 127 else 0
+
+
+def build_schedule(elements, sec_per_quarter: float, tempo_changes=(), transpose_semitones: int = 0) -> Schedule:
+    """Walks the prepared elements once, resolving durations, staccato and ties into a Schedule.
+
+    Pitches are reduced to MIDI numbers here, so backends never see music21 objects.
+    tempo_changes holds (offset in quarter lengths, BPM) pairs sorted by offset; each
+    one sets the tempo for the elements starting at or after its offset.
+    transpose_semitones is added to every MIDI number.
+    """
+    schedule = Schedule()
+    append = schedule.append
+    # Element class -> kind, resolved once per class instead of an isinstance chain per element
+    kind_by_class = {}
+    # 用于跟踪tied notes的位集：第n位为1表示MIDI音符n从前一个音符/和弦延续
+    tied_mask = 0
+    changes = iter(tempo_changes)
+    next_change = next(changes, None)
+
+    for element in elements:
+        # Tempo is resolved here, so durations in the schedule already reflect every change
+        while next_change is not None and element.offset >= next_change[0]:
+            sec_per_quarter = 60.0 / next_change[1]
+            next_change = next(changes, None)
+        duration_sec = element.duration.quarterLength * sec_per_quarter
+
+        # --- Determine wait duration (staccato shortens it) ---
+        wait_sec = duration_sec * _wait_factor(element)
+
+        element_class = type(element)
+        kind = kind_by_class.get(element_class, -1)
+        if kind == -1:
+            kind = kind_by_class[element_class] = _element_kind(element_class)
+
+        # --- 处理音符和休止符，包括tie信息 ---
+        if kind == EVENT_NOTE:
+            midi = element.pitch.midi + transpose_semitones
+            # 检查这个音符是否是tied continuation
+            is_tied = bool(tied_mask & _tie_bit(midi))
+            append(EVENT_NOTE, (midi,), duration_sec, wait_sec, is_tied)
+
+            # 更新tied音符跟踪位集
+            if _has_tie_start(element):
+                # 标记为tied，供下一个音符使用
+                tied_mask |= _tie_bit(midi)
+            else:
+                # 如果之前是tied但现在不是start/continue，移除
+                tied_mask &= ~_tie_bit(midi)
+
+        elif kind == EVENT_CHORD:
+            midi_notes = tuple(p.midi + transpose_semitones for p in element.pitches)
+            # 收集当前chord中哪些音符是tied
+            current_tied_notes = tuple(n for n in midi_notes if tied_mask & _tie_bit(n))
+            append(EVENT_CHORD, midi_notes, duration_sec, wait_sec, current_tied_notes)
+
+            # 更新tied位集，仅保留仍然有tie的音符（将延续到下一个音符/和弦）
+            tied_mask = 0
+            for n in element:
+                if _has_tie_start(n):
+                    tied_mask |= _tie_bit(n.pitch.midi + transpose_semitones)
+
+        elif kind == EVENT_REST:
+            # 休止符不影响tied状态，所有tied音符都保持不变
+            append(EVENT_REST, (), duration_sec, wait_sec, None)
+        else:
+            print(f"Skipping unknown element type: {type(element)}")
+
+    return schedule
+
+
+PREPARED_CACHE_DIR = CACHE_DIRECTORY
+PREPARED_CACHE_VERSION = 4 # Bump when Schedule or the stored layout changes
+RECENT_PREPARED_LIMIT = 8 # Prepared scores kept in memory, so replays skip even the disk cache
+
+
+def _prepared_cache_key(score_path: str, tolerance: int, min_midi: int, max_midi: int) -> str | None:
+    """Cache key for a prepared score; changes with the file's mtime and the preparation parameters."""
+    try:
+        mtime_ns = os.stat(score_path).st_mtime_ns
+    except OSError:
+        return None
+    raw = f"{PREPARED_CACHE_VERSION}|{os.path.abspath(score_path)}|{mtime_ns}|{tolerance}|{min_midi}|{max_midi}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _load_prepared_cache(key: str):
+    """Returns a cached (schedule, apply_shifts, mode description, bpm), or None if missing/unreadable."""
+    try:
+        with open(os.path.join(PREPARED_CACHE_DIR, f"{key}.pkl"), 'rb') as f:
+            stored, apply_shifts, playback_mode_desc, bpm = pickle.load(f)
+        kinds, midi_notes, tied, duration_sec, wait_sec, start_offsets = stored
+    except Exception:
+        return None # Missing, truncated or otherwise unusable entry: prepare the score again
+
+    schedule = Schedule()
+    schedule.kinds = kinds
+    schedule.midi_notes = midi_notes
+    schedule.tied = tied
+    schedule.duration_sec = duration_sec
+    schedule.wait_sec = wait_sec
+    schedule.start_offsets = start_offsets
+    return schedule, apply_shifts, playback_mode_desc, bpm
+
+
+def _save_prepared_cache(key: str, prepared):
+    """Stores a prepared score; the schedule holds only arrays and ints, so it is pickled as-is."""
+    schedule, apply_shifts, playback_mode_desc, bpm = prepared
+    stored = (schedule.kinds, schedule.midi_notes, schedule.tied, schedule.duration_sec, schedule.wait_sec, schedule.start_offsets)
+    try:
+        write_cache_file(os.path.join(PREPARED_CACHE_DIR, f"{key}.pkl"),
+                         lambda f: pickle.dump((stored, apply_shifts, playback_mode_desc, float(bpm)), f,
+                                               protocol=pickle.HIGHEST_PROTOCOL),
+                         binary=True)
+    except (OSError, pickle.PicklingError) as e:
+        print(f"Warning: Could not write prepared score cache in '{PREPARED_CACHE_DIR}': {e}", file=sys.stderr)
+
+
+def _prepare_score_file(score_path: str, key: str | None, tolerance: int, min_midi: int, max_midi: int):
+    """Parses and prepares a score with music21, storing the result in the disk cache under key."""
+    elements_to_play, apply_shifts, playback_mode_desc, bpm, tempo_changes, transpose_semitones = \
+        load_and_prepare_score(score_path, tolerance, min_midi, max_midi)
+    if elements_to_play is None:
+        return None, apply_shifts, playback_mode_desc, bpm
+    # All music21 attribute access happens here, before timing starts
+    schedule = build_schedule(elements_to_play, 60.0 / bpm, tempo_changes, transpose_semitones)
+    if key:
+        _save_prepared_cache(key, (schedule, apply_shifts, playback_mode_desc, bpm))
+    return schedule, apply_shifts, playback_mode_desc, bpm
+
+
+def _warm_prepared_cache(score_path: str, key: str, tolerance: int, min_midi: int, max_midi: int) -> bool:
+    """Process pool task: prepares one score into the disk cache. Only a flag goes back to the parent.
+
+    Runs while a song may be playing, so the parsing progress that load_and_prepare_score
+    prints is discarded instead of interleaving with the player's console output.
+    """
+    if os.path.exists(os.path.join(PREPARED_CACHE_DIR, f"{key}.pkl")):
+        return True # Prepared meanwhile, e.g. by the player itself
+    try:
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            return _prepare_score_file(score_path, key, tolerance, min_midi, max_midi)[0] is not None
+    except Exception:
+        return False
 
 
 class Player:
@@ -42,20 +259,18 @@ class Player:
         self.current_score_path = None
 
         self.is_playing = False
-        self.is_paused = False
         self.playback_thread: threading.Thread | None = None
         self.stop_event = threading.Event()
+        # Set while playing, cleared while paused; the playback thread blocks on it instead of polling
+        self.resume_event = threading.Event()
+        self.resume_event.set()
+        self._paused_at = 0.0 # time.perf_counter() when pause was last requested
 
         # Determine backend range
         self.backend_min_midi = 48 # Default fallback (C3)
         self.backend_max_midi = 83 # Default fallback (B5)
-        backend_name = None
-        if isinstance(backend, PynputKeyboardBackend):
-            backend_name = 'pynput'
-        elif isinstance(backend, SamplePlaybackBackend):
-            backend_name = 'sample'
-        elif isinstance(backend, MidiPlaybackBackend):
-            backend_name = 'midi'
+        # Backends identify themselves, so the player never imports their (heavy) modules
+        backend_name = backend.name
         
         if backend_name and backend_name in BACKEND_MIDI_RANGES:
             self.backend_min_midi = BACKEND_MIDI_RANGES[backend_name]['min']
@@ -63,9 +278,150 @@ class Player:
         else:
              print(f"Warning: Could not determine MIDI range for backend type {type(backend)}. Using default C3-B5.", file=sys.stderr)
 
+        # Notes are dispatched (backend_latency + nudge_sec) early so the audible onset lands on the beat
+        self.backend_latency = BACKEND_LATENCIES.get(backend_name, 0.0)
+        self.nudge_sec = 0.0
+
+        # While a score plays, the autoplay successor is chosen and parsed on this loader thread,
+        # so the playback thread doesn't stall on music21 parsing between tracks
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='score-loader')
+        self._prefetch: tuple[int, str, Future] | None = None # (score index, path, future)
+        # Recently prepared scores by cache key, least recently used first
+        self._recent_prepared: OrderedDict[str, tuple] = OrderedDict()
+        self._recent_prepared_lock = threading.Lock()
+        self._warmer: ProcessPoolExecutor | None = None # Set by warm_prepared_cache()
+
         print(f"Player initialized with backend MIDI range: {self.backend_min_midi}-{self.backend_max_midi}")
         self.backend.start()
 
+    @property
+    def is_paused(self) -> bool:
+        return not self.resume_event.is_set()
+
+    @is_paused.setter
+    def is_paused(self, paused: bool):
+        if paused:
+            self._paused_at = time.perf_counter()
+            self.resume_event.clear()
+            # Silence events the backend already has queued now, not at the playback thread's next wakeup
+            self.backend.cancel_scheduled()
+        else:
+            self.resume_event.set()
+
+    @property
+    def discovered_scores(self) -> list[str]:
+        return self._discovered_scores
+
+    @discovered_scores.setter
+    def discovered_scores(self, scores: list[str]):
+        self._discovered_scores = scores
+        # File names for status messages, parallel to the paths and built once per list
+        self.score_names = [os.path.basename(path) for path in scores]
+
+    @property
+    def current_score_path(self) -> str | None:
+        return self._current_score_path
+
+    @current_score_path.setter
+    def current_score_path(self, score_path: str | None):
+        self._current_score_path = score_path
+        # File name for status messages, computed once per score instead of per print
+        self.current_score_name = os.path.basename(score_path) if score_path else None
+
+    def _bind_steps(self, schedule: Schedule, apply_shifts: bool, volume: float) -> list[tuple]:
+        """Resolves each step to a (backend method, args) pair before playback starts.
+
+        The kind tag indexes a small jump table once per step here, so the timing
+        loop makes a single call per step with no branching on the step's kind.
+        """
+        backend = self.backend
+        kinds, midi_notes, tied, durations = schedule.kinds, schedule.midi_notes, schedule.tied, schedule.duration_sec
+        # Indexed by EVENT_NOTE / EVENT_CHORD / EVENT_REST
+        binders = (
+            lambda i: (backend.play_note, (midi_notes[i][0], durations[i], apply_shifts, volume, tied[i])),
+            lambda i: (backend.play_chord, (midi_notes[i], durations[i], apply_shifts, volume, tied[i])),
+            lambda i: (backend.rest, (durations[i],)),
+        )
+        return [binders[kinds[i]](i) for i in range(len(schedule))]
+
+    def _play_schedule(self, schedule: Schedule, apply_shifts: bool, volume: float):
+        """Plays a schedule by calling the backend at each step's time. Returns early on stop."""
+        steps = self._bind_steps(schedule, apply_shifts, volume)
+        # Each step ends at an absolute offset from t0, so late wakeups and backend
+        # call time are absorbed by the next wait instead of accumulating as drift
+        end_offsets = schedule.start_offsets
+        t0 = time.perf_counter()
+        for i, (call, args) in enumerate(steps):
+            if not self.resume_event.is_set():
+                # Blocks while paused; stop() also sets resume_event so this never hangs
+                paused_at = time.perf_counter()
+                self.resume_event.wait()
+                t0 += time.perf_counter() - paused_at # Shift the timeline by the paused time
+                if self.stop_event.is_set():
+                    break
+
+            # play_note (with tied state) / play_chord (with tied notes) / rest
+            call(*args)
+
+            # Wait until this step's absolute end time (the next step's start offset).
+            # This wait is the loop's only stop check: it returns True as soon as stop
+            # is requested. A pause takes effect before the next step.
+            lead = self.backend_latency + self.nudge_sec # Read per step so nudges apply immediately
+            if self.stop_event.wait(timeout=max(0.0, t0 + end_offsets[i + 1] - lead - time.perf_counter())):
+                break
+        else:
+            return
+        print("Playback stop signal received during score.")
+
+    def _play_schedule_lookahead(self, schedule: Schedule, apply_shifts: bool, volume: float):
+        """Plays a schedule by keeping the backend's own queue LOOKAHEAD_SEC ahead of real time.
+
+        The backend issues each event at its absolute time, so jitter in this thread
+        (GC pauses, slow wakeups) no longer shifts notes. Returns early on stop.
+        """
+        backend = self.backend
+        kinds, midi_notes, tied = schedule.kinds, schedule.midi_notes, schedule.tied
+        durations, start_offsets = schedule.duration_sec, schedule.start_offsets
+        count = len(schedule)
+        index = 0
+        t0 = time.perf_counter()
+        while True:
+            lead = self.backend_latency + self.nudge_sec
+            if not self.resume_event.is_set():
+                # Drop queued events (again, in case a refill raced the pause) and resume
+                # from the first step that had not started when pause was pressed
+                backend.cancel_scheduled()
+                paused_at = self._paused_at
+                while index > 0 and t0 + start_offsets[index - 1] - lead >= paused_at:
+                    index -= 1
+                self.resume_event.wait()
+                t0 += time.perf_counter() - paused_at # Shift the timeline by the paused time
+                if self.stop_event.is_set():
+                    break
+                continue
+            if index == count:
+                # Everything is queued; wait until the end of the score, in slices so pause still works
+                remaining = t0 + start_offsets[-1] - time.perf_counter()
+                if remaining <= 0:
+                    return
+                if self.stop_event.wait(timeout=min(remaining, LOOKAHEAD_SEC / 2)):
+                    break
+                continue
+
+            horizon = time.perf_counter() + LOOKAHEAD_SEC
+            batch = []
+            while index < count and t0 + start_offsets[index] - lead < horizon:
+                batch.append(ScheduledEvent(t0 + start_offsets[index] - lead, kinds[index], midi_notes[index],
+                                            durations[index], apply_shifts, volume, tied[index]))
+                index += 1
+            if batch:
+                backend.schedule_events(batch)
+            # The refill wait doubles as the loop's stop check
+            if self.stop_event.wait(timeout=LOOKAHEAD_SEC / 2):
+                break
+        backend.cancel_scheduled()
+        print("Playback stop signal received during score.")
+
     def _playback_loop(self):
         """The actual playback logic run in a separate thread. Loops automatically on natural finish."""
         print("Playback thread started.")
@@ -86,116 +442,40 @@ class Player:
 
             # --- Inner loop for playing a single score ---
             error_occurred = False
-            elements_to_play = None
+            schedule = None
             apply_shifts = False
             playback_mode_desc = "Unknown"
             bpm = 120.0
             song_finished_naturally = False
             current_volume = 0.6 # Default volume (approx mf)
-            
-            # 用于跟踪tied notes的字典
-            tied_pitches = {}  # pitch.nameWithOctave -> pitch object
 
             try:
-                # Load and prepare score within the thread, passing the backend's range
-                elements_to_play, apply_shifts, playback_mode_desc, bpm = \
-                    load_and_prepare_score(self.current_score_path,
-                                             self.tolerance,
-                                             self.backend_min_midi,
-                                             self.backend_max_midi)
-
-                if elements_to_play is None:
-                    print(f"Failed to load or prepare score '{os.path.basename(self.current_score_path)}'. Aborting playback of this score.")
+                # Load and prepare score (prefetched in the background if it was the planned successor)
+                schedule, apply_shifts, playback_mode_desc, bpm = \
+                    self._take_prepared_score(self.current_score_path)
+
+                if schedule is None:
+                    print(f"Failed to load or prepare score '{self.current_score_name}'. Aborting playback of this score.")
                     error_occurred = True # Treat loading failure as an error
                 else:
-                    sec_per_quarter = 60.0 / bpm
-                    print(f"Starting playback of '{os.path.basename(self.current_score_path)}' ({playback_mode_desc}, Tempo: {bpm} BPM)")
-
-                    # Iterate through notes and rests
-                    for element in elements_to_play:
-                        if self.stop_event.is_set():
-                            print("Playback stop signal received during score.")
-                            break
-
-                        while self.is_paused:
-                            if self.stop_event.is_set(): break
-                            time.sleep(0.1)
-                        if self.stop_event.is_set(): break
-
-                        duration_sec = element.duration.quarterLength * sec_per_quarter
-                        
-                        # --- Determine wait duration (handling staccato) ---
-                        wait_duration_sec = duration_sec # Default to full duration
-                        is_staccato = False
-                        if hasattr(element, 'articulations'):
-                            for art in element.articulations:
-                                if isinstance(art, articulations.Staccato):
-                                    is_staccato = True
-                                    break
-                        if is_staccato:
-                            wait_duration_sec = duration_sec * 0.5 # Shorten wait for staccato
-                            
-                        # --- 处理音符和休止符，包括tie信息 ---
-                        if isinstance(element, note.Note):
-                            # 检查这个音符是否是tied continuation
-                            is_tied = (element.pitch.nameWithOctave in tied_pitches)
-                            
-                            # 检查这个音符是否有tie开始
-                            has_tie_start = False
-                            if hasattr(element, 'tie') and element.tie:
-                                has_tie_start = element.tie.type in ('start', 'continue')
-                                
-                            # 播放音符，传递tied状态
-                            self.backend.play_note(element.pitch, duration_sec, apply_shifts, current_volume, is_tied)
-                            
-                            # 更新tied音符跟踪字典
-                            if has_tie_start:
-                                # 标记为tied，供下一个音符使用
-                                tied_pitches[element.pitch.nameWithOctave] = element.pitch
-                            elif element.pitch.nameWithOctave in tied_pitches and not has_tie_start:
-                                # 如果之前是tied但现在不是start/continue，移除
-                                del tied_pitches[element.pitch.nameWithOctave]
-                                
-                        elif isinstance(element, chord.Chord):
-                            # 收集当前chord中哪些音符是tied
-                            current_tied_pitches = []
-                            for p in element.pitches:
-                                if p.nameWithOctave in tied_pitches:
-                                    current_tied_pitches.append(tied_pitches[p.nameWithOctave])
-                            
-                            # 播放和弦，传递tied信息
-                            self.backend.play_chord(element.pitches, duration_sec, apply_shifts, current_volume, current_tied_pitches)
-                            
-                            # 更新tied音符跟踪
-                            new_tied_pitches = {}
-                            
-                            # 检查和弦中每个音符的tie状态
-                            for note_in_chord in element:
-                                if hasattr(note_in_chord, 'tie') and note_in_chord.tie:
-                                    has_tie_start = note_in_chord.tie.type in ('start', 'continue')
-                                    if has_tie_start:
-                                        # 这个音符将延续到下一个音符/和弦
-                                        new_tied_pitches[note_in_chord.pitch.nameWithOctave] = note_in_chord.pitch
-                            
-                            # 更新tied音符字典，仅保留仍然有tie的音符
-                            tied_pitches = new_tied_pitches
-                            
-                        elif isinstance(element, note.Rest):
-                            # 休止符不影响tied状态，所有tied音符都保持不变
-                            self.backend.rest(duration_sec)
+                    print(f"Starting playback of '{self.current_score_name}' ({playback_mode_desc}, Tempo: {bpm} BPM)")
+                    self._prefetch_next_score()
+
+                    # Collect once up front and freeze the survivors, so collections during the
+                    # timing loop only scan new objects. GC stays on: the loader thread is
+                    # parsing the next score meanwhile and creates many reference cycles.
+                    gc.collect()
+                    gc.freeze()
+                    # Real-time priority only for the timing loop, never for parsing or printing
+                    raise_thread_priority()
+                    try:
+                        if self.backend.supports_scheduling:
+                            self._play_schedule_lookahead(schedule, apply_shifts, current_volume)
                         else:
-                            print(f"Skipping unknown element type: {type(element)}")
-                            continue # Skip the wait for unknown elements
-
-                        # Wait for duration (with pause/stop checks)
-                        sleep_end_time = time.monotonic() + wait_duration_sec # Use potentially shortened duration
-                        while time.monotonic() < sleep_end_time:
-                            while self.is_paused:
-                                if self.stop_event.is_set(): break
-                                time.sleep(0.1)
-                            if self.stop_event.is_set(): break
-                            time.sleep(min(0.01, max(0, sleep_end_time - time.monotonic())))
-                        if self.stop_event.is_set(): break
+                            self._play_schedule(schedule, apply_shifts, current_volume)
+                    finally:
+                        reset_thread_priority()
+                        gc.unfreeze()
 
                     # If the loop finished without being stopped
                     if not self.stop_event.is_set():
@@ -205,9 +485,7 @@ class Player:
                 print(f"Configuration/Value Error during playback: {e}", file=sys.stderr)
                 error_occurred = True
             except Exception as e:
-                print(f"Unexpected error during playback loop: {e}", file=sys.stderr)
-                import traceback
-                traceback.print_exc()
+                log.exception("Unexpected error during playback loop: %s", e)
                 error_occurred = True
             # No finally block here, decision logic below
 
@@ -219,27 +497,21 @@ class Player:
                 print("Playback stopped by user signal.")
                 playback_should_continue = False
             elif song_finished_naturally:
-                print(f"Song '{os.path.basename(self.current_score_path)}' finished naturally.")
+                print(f"Song '{self.current_score_name}' finished naturally.")
                 print("Autoplaying next in 3 seconds...")
-                # Wait, but allow interruption by stop_event
-                wait_start_time = time.monotonic()
-                while time.monotonic() < wait_start_time + 3.0:
-                     if self.stop_event.is_set():
-                          print("Stop requested during autoplay pause.")
-                          playback_should_continue = False
-                          break
-                     time.sleep(0.1)
-                
-                if not playback_should_continue: # Stop was requested during pause
-                     break # Exit the outer while loop
-
-                # Get next score to continue the loop
+                # One blocking wait that returns early (True) if stop is requested
+                if self.stop_event.wait(3.0):
+                    print("Stop requested during autoplay pause.")
+                    playback_should_continue = False
+                    break # Exit the outer while loop
+
+                # Get next score to continue the loop (normally the one already prefetched)
                 print("Selecting next track for autoplay...")
-                next_index = self._get_next_score_index()
+                next_index = self._planned_next_index()
                 if next_index != -1:
                     self.selected_score_index = next_index
                     self.current_score_path = self.discovered_scores[self.selected_score_index]
-                    print(f"Next up: {os.path.basename(self.current_score_path)}")
+                    print(f"Next up: {self.current_score_name}")
                     # Let the outer while loop continue
                 else:
                     print("Could not determine next score or no scores left. Stopping playback.")
@@ -256,13 +528,94 @@ class Player:
         # Keep selected_score_index as is, don't reset to -1
         print("Playback thread finished.")
 
+    def _prepare_score(self, score_path: str):
+        """Returns (schedule, apply_shifts, mode description, bpm) for a score; schedule is None on failure.
+
+        Prepared schedules are cached on disk, so a score is only parsed by music21
+        again when the file, the tolerance or the backend range changes. The most
+        recent ones are also kept in memory; schedules are read-only, so they are shared.
+        """
+        key = _prepared_cache_key(score_path, self.tolerance, self.backend_min_midi, self.backend_max_midi)
+        if key:
+            with self._recent_prepared_lock:
+                recent = self._recent_prepared.get(key)
+                if recent is not None:
+                    self._recent_prepared.move_to_end(key)
+                    return recent
+        prepared = self._prepare_score_uncached(score_path, key)
+        if key and prepared[0] is not None:
+            with self._recent_prepared_lock:
+                self._recent_prepared[key] = prepared
+                if len(self._recent_prepared) > RECENT_PREPARED_LIMIT:
+                    self._recent_prepared.popitem(last=False)
+        return prepared
+
+    def _prepare_score_uncached(self, score_path: str, key: str | None):
+        """Loads a prepared score from the disk cache, or parses and prepares it with music21."""
+        cached = _load_prepared_cache(key) if key else None
+        if cached is not None:
+            print(f"Using cached preparation for '{os.path.basename(score_path)}'.")
+            return cached
+
+        return _prepare_score_file(score_path, key, self.tolerance, self.backend_min_midi, self.backend_max_midi)
+
+    def warm_prepared_cache(self):
+        """Prepares every uncached discovered score into the disk cache on a background process pool.
+
+        Parsing is CPU-bound and independent per file, so it spreads across cores;
+        one core is left free for playback. Nothing waits on the results: a score
+        that is played before its worker finishes is simply prepared as usual.
+        """
+        pending = []
+        for score_path in self.discovered_scores:
+            key = _prepared_cache_key(score_path, self.tolerance, self.backend_min_midi, self.backend_max_midi)
+            if key and not os.path.exists(os.path.join(PREPARED_CACHE_DIR, f"{key}.pkl")):
+                pending.append((score_path, key))
+        if not pending:
+            return
+        workers = max(1, min(len(pending), (os.cpu_count() or 2) - 1))
+        print(f"Preparing {len(pending)} uncached scores in the background ({workers} processes)...")
+        # Spawn rather than fork: this process already runs logging, loader and backend threads,
+        # and a forked child could inherit one of their locks in a held state
+        self._warmer = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        for score_path, key in pending:
+            self._warmer.submit(_warm_prepared_cache, score_path, key,
+                                self.tolerance, self.backend_min_midi, self.backend_max_midi)
+
+    def _prefetch_next_score(self):
+        """Chooses the autoplay successor now and starts preparing it on the loader thread."""
+        next_index = self._get_next_score_index()
+        if next_index == -1:
+            self._prefetch = None
+            return
+        next_path = self.discovered_scores[next_index]
+        self._prefetch = (next_index, next_path, self._loader.submit(self._prepare_score, next_path))
+
+    def _planned_next_index(self) -> int:
+        """Index of the prefetched successor if it is still valid, otherwise a freshly chosen one."""
+        if self._prefetch:
+            index, path, _ = self._prefetch
+            if index < len(self.discovered_scores) and self.discovered_scores[index] == path:
+                return index
+        return self._get_next_score_index()
+
+    def _take_prepared_score(self, score_path: str):
+        """Returns _prepare_score's result, using the prefetched one when it matches."""
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch and prefetch[1] == score_path:
+            try:
+                return prefetch[2].result()
+            except Exception as e:
+                print(f"Background load of '{os.path.basename(score_path)}' failed ({e}), retrying.", file=sys.stderr)
+        return self._prepare_score(score_path)
+
     def _start_thread(self, score_path: str):
         if self.is_playing:
             print("Warning: Playback already in progress. Stopping first.")
             self.stop()
 
         self.current_score_path = score_path
-        print(f"Attempting to play: {os.path.basename(self.current_score_path)} (Index: {self.selected_score_index}) with tolerance {self.tolerance}...")
+        print(f"Attempting to play: {self.current_score_name} (Index: {self.selected_score_index}) with tolerance {self.tolerance}...")
         try:
             self.stop_event.clear()
             self.is_paused = False # Ensure not starting paused
@@ -274,34 +627,44 @@ class Player:
             self.is_playing = False
             self.current_score_path = None
 
+    @property
+    def playback_mode(self) -> str:
+        return self._playback_mode
+
+    @playback_mode.setter
+    def playback_mode(self, mode: str):
+        self._playback_mode = mode
+        # Bound once per mode change, so choosing a successor doesn't compare mode strings
+        self._next_index_in_mode = {
+            'random': self._next_random_index,
+            'sequential': self._next_sequential_index,
+        }.get(mode, self._next_index_unknown_mode)
+
     def _get_next_score_index(self) -> int:
         if not self.discovered_scores:
             return -1
-
-        num_scores = len(self.discovered_scores)
-        current_idx = self.selected_score_index
-
-        if self.playback_mode == 'random':
-            if num_scores == 1:
-                return 0
-            possible_indices = list(range(num_scores))
-            if current_idx >= 0:
-                try:
-                    if 0 <= current_idx < len(possible_indices):
-                         possible_indices.pop(current_idx)
-                    else: # Invalid index state, choose from all
-                        print(f"Warning: Current index {current_idx} out of bounds. Choosing random from all.")
-                except IndexError: # Should not happen with check, but safety
-                    pass
-            if not possible_indices: # If pop removed the only element
-                 possible_indices = list(range(num_scores))
-            return random.choice(possible_indices)
-        elif self.playback_mode == 'sequential':
-            # If index is -1 (initial state), start from 0, otherwise increment
-            return (current_idx + 1) % num_scores
-        else:
-            print(f"Error: Unknown playback mode '{self.playback_mode}'", file=sys.stderr)
-            return -1 # Indicate error
+        return self._next_index_in_mode(len(self.discovered_scores), self.selected_score_index)
+
+    @staticmethod
+    def _next_random_index(num_scores: int, current_idx: int) -> int:
+        if num_scores == 1:
+            return 0
+        if 0 <= current_idx < num_scores:
+            # Draw from the other num_scores - 1 indices by skipping over the current one
+            next_idx = random.randrange(num_scores - 1)
+            return next_idx + 1 if next_idx >= current_idx else next_idx
+        if current_idx >= 0: # Invalid index state, choose from all
+            print(f"Warning: Current index {current_idx} out of bounds. Choosing random from all.")
+        return random.randrange(num_scores)
+
+    @staticmethod
+    def _next_sequential_index(num_scores: int, current_idx: int) -> int:
+        # If index is -1 (initial state), start from 0, otherwise increment
+        return (current_idx + 1) % num_scores
+
+    def _next_index_unknown_mode(self, num_scores: int, current_idx: int) -> int:
+        print(f"Error: Unknown playback mode '{self.playback_mode}'", file=sys.stderr)
+        return -1 # Indicate error
 
     def start_or_resume(self):
         if not self.discovered_scores:
@@ -313,7 +676,7 @@ class Player:
                 print("Resuming playback...")
                 self.is_paused = False
             else:
-                print(f"Playback is already running ('{os.path.basename(self.current_score_path or 'Unknown')}'). Press F11 to Pause/Resume, F10 to Stop.")
+                print(f"Playback is already running ('{self.current_score_name or 'Unknown'}'). Press F11 to Pause/Resume, F10 to Stop.")
             return
 
         # Not playing, start a new track
@@ -366,6 +729,17 @@ class Player:
         else:
             print("Playback Resumed.")
 
+    def set_nudge(self, seconds: float):
+        """Sets the extra timing offset (positive plays earlier) on top of the backend's latency."""
+        self.nudge_sec = seconds
+        print(f"Timing nudge: {self.nudge_sec * 1000:+.0f} ms (backend latency {self.backend_latency * 1000:.0f} ms)")
+
+    def nudge_earlier(self):
+        self.set_nudge(self.nudge_sec + NUDGE_STEP_SEC)
+
+    def nudge_later(self):
+        self.set_nudge(self.nudge_sec - NUDGE_STEP_SEC)
+
     def _change_track(self, direction: int):
         if not self.discovered_scores:
             print("No scores found to select from.")
@@ -385,7 +759,7 @@ class Player:
 
         self.selected_score_index = new_index
         # self._start_thread(self.discovered_scores[self.selected_score_index]) # REMOVED: Don't auto-start
-        print(f"Selected: {os.path.basename(self.discovered_scores[self.selected_score_index])}. Press F9 to play.")
+        print(f"Selected: {self.score_names[self.selected_score_index]}. Press F9 to play.")
 
     def next_track(self):
         self._change_track(1)
@@ -405,5 +779,8 @@ class Player:
     def cleanup(self):
         print("Cleaning up Player...")
         self.stop() # Ensure playback is stopped
+        self._loader.shutdown(wait=False, cancel_futures=True)
+        if self._warmer:
+            self._warmer.shutdown(wait=False, cancel_futures=True)
         self.backend.stop()
         print("Player cleanup complete.")
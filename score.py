@@ -1,15 +1,16 @@
+import json
 import os
-import statistics  # Import statistics module
 import sys
+import tempfile
+from collections.abc import Callable
+from typing import IO
 
 # Attempt to import music21
 try:
     from music21 import (
         chord,
         converter,
-        interval,
         note,
-        pitch,  # Added for type hinting
         stream,
         tempo,
     )
@@ -19,10 +20,13 @@ except ImportError:
     sys.exit(1)
 
 from config import (
+    CACHE_DIRECTORY,
     DEFAULT_TEMPO_BPM,
 )
 
 
+SCORE_EXTENSIONS = ('.mxl', '.musicxml')
+
 def scan_scores(directory_path: str) -> list[str]:
     """Scans the specified directory **recursively** for .mxl and .musicxml files."""
     discovered_scores = []
@@ -37,11 +41,21 @@ def scan_scores(directory_path: str) -> list[str]:
 
     print(f"Recursively scanning for scores in '{directory_path}'...")
     try:
-        for dirpath, _, filenames in os.walk(directory_path):
-            for filename in filenames:
-                if filename.lower().endswith(('.mxl', '.musicxml')):
-                    full_path = os.path.join(dirpath, filename)
-                    discovered_scores.append(full_path)
+        # Walk with scandir directly: DirEntry carries the joined path and the file type,
+        # so no extra stat or os.path.join is needed per entry
+        pending_dirs = [directory_path]
+        while pending_dirs:
+            try:
+                entries = os.scandir(pending_dirs.pop())
+            except OSError:
+                continue # Unreadable subdirectory, skipped like os.walk does
+            with entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        if not entry.is_symlink(): # Don't follow directory links
+                            pending_dirs.append(entry.path)
+                    elif entry.name.lower().endswith(SCORE_EXTENSIONS):
+                        discovered_scores.append(entry.path)
 
         if discovered_scores:
             # Sort the found scores for consistent order (optional, but good)
@@ -56,76 +70,195 @@ def scan_scores(directory_path: str) -> list[str]:
 
     return discovered_scores
 
+SCAN_CACHE_PATH = os.path.join(CACHE_DIRECTORY, 'score_scan.json')
+
+def write_cache_file(path: str, write: Callable[[IO], None], binary: bool = False):
+    """Creates path in CACHE_DIRECTORY with write(file), through a temporary file renamed into place.
+
+    Readers (possibly another process) never see a partial file. Raises OSError on failure.
+    """
+    os.makedirs(CACHE_DIRECTORY, mode=0o700, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIRECTORY, suffix='.tmp')
+    try:
+        with (os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _directory_mtimes(directory_path: str) -> dict[str, int]:
+    """Returns the mtime (ns) of the directory and every subdirectory below it."""
+    mtimes = {}
+    for dirpath, _, _ in os.walk(directory_path):
+        mtimes[dirpath] = os.stat(dirpath).st_mtime_ns
+    return mtimes
+
+def _load_scan_cache(directory_path: str) -> list[str] | None:
+    """Returns the cached scan for a directory, or None if missing or stale.
+
+    Adding, removing or renaming an entry updates the mtime of its parent
+    directory, so the cache is valid as long as every recorded directory
+    still has its recorded mtime. This only stats directories, no listing.
+    Paths are stored relative to the directory and joined back onto
+    directory_path as given, so they match what scan_scores would return
+    from the current working directory.
+    """
+    try:
+        with open(SCAN_CACHE_PATH, encoding='utf-8') as f:
+            entry = json.load(f).get(os.path.abspath(directory_path))
+        if not entry:
+            return None
+        for dirpath, mtime_ns in entry['mtimes'].items():
+            if os.stat(os.path.join(directory_path, dirpath)).st_mtime_ns != mtime_ns:
+                return None
+        return [os.path.join(directory_path, score) for score in entry['scores']]
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+def _save_scan_cache(directory_path: str, mtimes: dict[str, int], scores: list[str]):
+    """Stores a scan result in the cache file, keyed by absolute directory path, with paths relative to it."""
+    try:
+        try:
+            with open(SCAN_CACHE_PATH, encoding='utf-8') as f:
+                cache = json.load(f)
+            if not isinstance(cache, dict):
+                cache = {}
+        except (OSError, ValueError):
+            cache = {}
+        cache[os.path.abspath(directory_path)] = {
+            'mtimes': {os.path.relpath(dirpath, directory_path): mtime_ns for dirpath, mtime_ns in mtimes.items()},
+            'scores': [os.path.relpath(score, directory_path) for score in scores],
+        }
+        write_cache_file(SCAN_CACHE_PATH, lambda f: json.dump(cache, f))
+    except OSError as e:
+        print(f"Warning: Could not write score scan cache '{SCAN_CACHE_PATH}': {e}", file=sys.stderr)
+
+def scan_scores_cached(directory_path: str) -> list[str]:
+    """Like scan_scores, but reuses the previous result if no directory changed."""
+    cached = _load_scan_cache(directory_path)
+    if cached is not None:
+        print(f"Using cached score list for '{directory_path}' ({len(cached)} scores).")
+        return cached
+
+    # Record mtimes before scanning so changes made during the scan invalidate the cache
+    mtimes = _directory_mtimes(directory_path) if os.path.isdir(directory_path) else {}
+    discovered_scores = scan_scores(directory_path)
+    if discovered_scores and mtimes:
+        _save_scan_cache(directory_path, mtimes, discovered_scores)
+    return discovered_scores
+
 def get_score_range(score_stream: stream.Stream) -> tuple[int | None, int | None]:
     """Finds the min and max MIDI pitch in a music21 stream."""
-    min_midi = float('inf')
-    max_midi = float('-inf')
-    has_notes = False
-    for element in score_stream.flat.notes:
-        has_notes = True
-        current_pitches: list[pitch.Pitch] = []
+    # Stream.pitches gathers note and chord pitches from nested streams in one traversal.
+    # Distinct MIDI numbers: at most 128 entries, reduced with one min()/max() at the end
+    midi_values = {p.midi for p in score_stream.pitches}
+    if not midi_values:
+        return None, None # No notes found
+
+    return int(min(midi_values)), int(max(midi_values))
+
+def get_melody_stats(melody_part: stream.Stream) -> tuple[int | None, int | None, list[int]]:
+    """Returns (min MIDI, max MIDI, centering counts) for a melody part in one pass.
+
+    The range covers every pitch, like get_score_range. The centering counts are a
+    128-bucket histogram with one entry per note, using the highest note of each
+    chord, as it's often the melodic one.
+    """
+    midi_values: set[int] = set()
+    # Fixed-size histogram instead of one list entry per note; midi_median only needs counts
+    melody_counts = [0] * 128
+    for element in melody_part.recurse().notes:
         if isinstance(element, note.Note):
-            current_pitches.append(element.pitch)
+            midi = element.pitch.midi
+            if midi is not None:
+                midi_values.add(midi)
+                melody_counts[midi] += 1
         elif isinstance(element, chord.Chord):
-            current_pitches.extend(element.pitches)
+            chord_midis = [p.midi for p in element.pitches if p.midi is not None]
+            if chord_midis:
+                midi_values.update(chord_midis)
+                melody_counts[max(chord_midis)] += 1
 
-        for p in current_pitches:
-            if p and p.midi is not None: # Check if pitch and midi are valid
-                min_midi = min(min_midi, p.midi)
-                max_midi = max(max_midi, p.midi)
-            else:
-                print(f"Warning: Found element {element} with invalid pitch/midi.", file=sys.stderr)
+    if not midi_values:
+        return None, None, melody_counts
+    return min(midi_values), max(midi_values), melody_counts
 
-    if not has_notes:
-        return None, None # No notes found
+def midi_median(midi_counts: list[int]) -> float:
+    """Median of MIDI numbers (0-127) given as a 128-bucket count, so no sort is needed.
 
-    # If inf values remain, means notes were present but had invalid MIDI
-    if min_midi == float('inf') or max_midi == float('-inf'):
-        print("Warning: Notes found but unable to determine valid MIDI range.", file=sys.stderr)
-        return None, None
+    Matches statistics.median: the mean of the two middle values for an even count.
+    """
+    n = sum(midi_counts)
+    lower_rank, upper_rank = (n - 1) // 2, n // 2 # 0-based ranks of the middle value(s)
+    lower = None
+    seen = 0
+    for midi, count in enumerate(midi_counts):
+        seen += count
+        if lower is None and seen > lower_rank:
+            lower = midi
+        if seen > upper_rank:
+            return (lower + midi) / 2
+    raise ValueError("no MIDI values to take the median of")
+
+def get_tempo_bpm(tempo_changes: list[tuple[float, float]]) -> float:
+    """Initial tempo: the first marking from get_tempo_changes, or DEFAULT_TEMPO_BPM if there is none.
+
+    Taking it from the changes means the score is searched once, and the marking
+    chosen is the earliest by offset across all parts.
+    """
+    if tempo_changes:
+        bpm = tempo_changes[0][1]
+        print(f"Found tempo: {bpm} BPM")
+        return bpm
+    print(f"No valid tempo found in score, using default: {DEFAULT_TEMPO_BPM} BPM")
+    return float(DEFAULT_TEMPO_BPM)
 
-    return int(min_midi), int(max_midi)
+def get_tempo_changes(flat: stream.Stream) -> list[tuple[float, float]]:
+    """Returns (offset in quarter lengths, BPM) for every usable tempo marking of a flattened score, in score order.
 
-def get_tempo_bpm(music21_stream: stream.Stream) -> float:
-    """Extracts the first tempo marking found in the stream, defaults to DEFAULT_TEMPO_BPM."""
+    Markings without a positive BPM number are skipped; an empty list means a single tempo.
+    """
+    changes = []
     try:
-        mm_marks = music21_stream.flat.getElementsByClass(tempo.MetronomeMark)
-        if mm_marks:
-            first_mark = mm_marks[0]
-            if hasattr(first_mark, 'number') and first_mark.number is not None:
-                bpm = first_mark.number
-                # Sometimes tempo is stored as text, try converting
-                if isinstance(bpm, str):
-                    try:
-                        bpm = float(bpm)
-                    except ValueError:
-                        print(f"Warning: Found text tempo '{bpm}' that couldn't be converted to number. Using default.")
-                        bpm = float(DEFAULT_TEMPO_BPM)
-
-                if isinstance(bpm, (int, float)) and bpm > 0:
-                    print(f"Found tempo: {bpm} BPM")
-                    return float(bpm)
-                else:
-                    print(f"Warning: Found invalid tempo mark ({first_mark}). Using default.")
-            else:
-                 print(f"Warning: Found MetronomeMark ({first_mark}) but it has no BPM number. Using default.")
-
-        # Fallback if no valid MetronomeMark found
-        print(f"No valid tempo found in score, using default: {DEFAULT_TEMPO_BPM} BPM")
-        return float(DEFAULT_TEMPO_BPM)
+        for mark in flat.getElementsByClass(tempo.MetronomeMark):
+            try:
+                bpm = float(mark.number)
+            except (TypeError, ValueError):
+                continue
+            if bpm > 0:
+                changes.append((float(mark.getOffsetBySite(flat)), bpm))
     except Exception as e:
-        print(f"Error extracting tempo: {e}. Using default.", file=sys.stderr)
-        return float(DEFAULT_TEMPO_BPM)
+        print(f"Error extracting tempo changes: {e}. Using a single tempo.", file=sys.stderr)
+        return []
+    return changes
 
-def load_and_prepare_score(score_path: str, tolerance: int, backend_min_midi: int, backend_max_midi: int) -> tuple[stream.Stream | None, bool, str, float]:
+def plays_sequentially(elements) -> bool:
+    """True if every note/rest starts exactly where the previous one ends (no overlaps, no gaps).
+
+    Such a stream is already a single line of notes and chords, as chordify() would produce.
+    """
+    expected_offset = None
+    for element in elements:
+        offset = element.offset
+        if expected_offset is not None and offset != expected_offset:
+            return False
+        expected_offset = offset + element.duration.quarterLength
+    return True
+
+def load_and_prepare_score(score_path: str, tolerance: int, backend_min_midi: int, backend_max_midi: int) -> tuple[stream.Stream | None, bool, str, float, list[tuple[float, float]], int]:
     """Loads a score, determines playback mode (full/melody) based on backend range,
-       performs transposition if needed, and returns the elements to play,
-       whether to apply individual shifts, the mode description, and tempo.
+       works out the transposition if needed, and returns the elements to play,
+       whether to apply individual shifts, the mode description, the initial tempo,
+       the score's tempo changes as (offset, BPM) pairs and the transposition in
+       semitones. The elements are not transposed; the offset is added to their MIDI numbers later.
     """
     elements_to_play = None
     apply_individual_shifts = True
     playback_mode = "Unknown"
     bpm = float(DEFAULT_TEMPO_BPM)
+    tempo_changes = []
+    transpose_semitones = 0
     error_occurred = False
 
     try:
@@ -136,7 +269,7 @@ def load_and_prepare_score(score_path: str, tolerance: int, backend_min_midi: in
         min_full, max_full = get_score_range(score)
         if min_full is None:
              print("Score contains no valid notes. Nothing to play.")
-             return None, False, "No Notes", bpm # Return None if no notes
+             return None, False, "No Notes", bpm, tempo_changes, transpose_semitones # Return None if no notes
 
         print(f"Full score range: MIDI {min_full} - {max_full}")
         print(f"Backend supported range: MIDI {backend_min_midi} - {backend_max_midi}")
@@ -146,15 +279,22 @@ def load_and_prepare_score(score_path: str, tolerance: int, backend_min_midi: in
         if min_full >= effective_min and max_full <= effective_max:
             print(f"Full score fits within backend range + tolerance {tolerance}. Playing all parts.")
             # Chordify the score to group simultaneous notes from different parts into chords
-            try:
-                print("Chordifying score...")
-                score = score.chordify()
-                print("Score chordified.")
-            except Exception as e:
-                print(f"Warning: Chordify failed: {e}. Playback might have incorrect simultaneity.", file=sys.stderr)
-                # Proceed without chordify if it fails
+            # One flattened stream serves the sequential check, the elements and the tempo search
+            flat = score.flatten()
+            if plays_sequentially(flat.notesAndRests):
+                # Nothing sounds simultaneously, so chordify would return the same line
+                print("Score is a single sequential line. Skipping chordify.")
+            else:
+                try:
+                    print("Chordifying score...")
+                    score = score.chordify()
+                    flat = score.flatten()
+                    print("Score chordified.")
+                except Exception as e:
+                    print(f"Warning: Chordify failed: {e}. Playback might have incorrect simultaneity.", file=sys.stderr)
+                    # Proceed without chordify if it fails
                 
-            elements_to_play = score.flat.notesAndRests
+            elements_to_play = flat.notesAndRests
             apply_individual_shifts = True # Shift notes slightly outside strict backend range if tolerance > 0
             playback_mode = "Full Score"
         else:
@@ -164,45 +304,17 @@ def load_and_prepare_score(score_path: str, tolerance: int, backend_min_midi: in
                 raise ValueError("Score has no parts")
 
             melody_part = score.parts[0]
-            min_melody, max_melody = get_score_range(melody_part)
+            # Range and centering values come from a single pass over the part
+            min_melody, max_melody, melody_counts = get_melody_stats(melody_part)
 
             if min_melody is None:
                 print("Warning: Part 1 (melody) contains no valid notes. Nothing to play.")
-                return None, False, "No Melody Notes", bpm # Return None if no melody notes
+                return None, False, "No Melody Notes", bpm, tempo_changes, transpose_semitones # Return None if no melody notes
 
             print(f"Melody (Part 1) range: MIDI {min_melody} - {max_melody}")
 
             # --- New Transposition Logic: Center the melody --- 
-            melody_notes = list(melody_part.flat.notes)
-            if not melody_notes:
-                print("Warning: Part 1 contains no actual notes for transposition analysis.")
-                # Keep existing min/max based range check as fallback?
-                # Or just return None? Let's return None for simplicity.
-                return None, False, "No Melody Notes", bpm
-                
-            melody_midi_values = []
-            for element in melody_notes:
-                 if isinstance(element, note.Note):
-                      if element.pitch.midi is not None:
-                           melody_midi_values.append(element.pitch.midi)
-                 elif isinstance(element, chord.Chord):
-                      # Use the highest note of the chord for centering analysis? Or lowest? Or average?
-                      # Let's use the highest note for now, as it's often the melodic one.
-                      # Alternatively, could use average, or all notes.
-                      highest_midi_in_chord = float('-inf')
-                      has_valid_pitch = False
-                      for p in element.pitches:
-                           if p.midi is not None:
-                                has_valid_pitch = True
-                                highest_midi_in_chord = max(highest_midi_in_chord, p.midi)
-                      if has_valid_pitch:
-                           melody_midi_values.append(highest_midi_in_chord)
-                           
-            if not melody_midi_values:
-                 print("Warning: Could not extract valid MIDI values from Part 1 notes.")
-                 return None, False, "No Melody Notes", bpm
-
-            median_midi = statistics.median(melody_midi_values)
+            median_midi = midi_median(melody_counts)
             TARGET_CENTER_MIDI = 65 # Target G4 as the center
             transpose_semitones = round(TARGET_CENTER_MIDI - median_midi) # Round to nearest semitone
 
@@ -218,18 +330,18 @@ def load_and_prepare_score(score_path: str, tolerance: int, backend_min_midi: in
             # --- End Original Logic --- 
 
             if transpose_semitones != 0:
+                # Applied to the MIDI numbers when the schedule is built, instead of cloning the part
                 print(f"Transposing melody by {transpose_semitones} semitones to center on keyboard.")
-                transposition_interval = interval.Interval(transpose_semitones)
-                melody_part = melody_part.transpose(transposition_interval)
-                print("Melody transposed.")
             else:
                  print("Melody median already centered or no transposition needed.")
 
-            elements_to_play = melody_part.flat.notesAndRests
+            elements_to_play = melody_part.flatten().notesAndRests
+            flat = score.flatten() # Tempo marks may sit in any part, not only the melody
             apply_individual_shifts = True # IMPORTANT: Allow individual shifting for outliers
             playback_mode = f"Melody Only+Centered (Transposed {transpose_semitones})"
 
-        bpm = get_tempo_bpm(score)
+        tempo_changes = get_tempo_changes(flat)
+        bpm = get_tempo_bpm(tempo_changes)
         if not isinstance(bpm, (int, float)) or bpm <= 0:
              print(f"Error: Invalid BPM ({bpm}) obtained. Cannot calculate duration.", file=sys.stderr)
              raise ValueError(f"Invalid BPM: {bpm}")
@@ -245,6 +357,6 @@ def load_and_prepare_score(score_path: str, tolerance: int, backend_min_midi: in
         error_occurred = True
 
     if error_occurred or elements_to_play is None:
-        return None, False, "Error Loading", float(DEFAULT_TEMPO_BPM)
+        return None, False, "Error Loading", float(DEFAULT_TEMPO_BPM), [], 0
 
-    return elements_to_play, apply_individual_shifts, playback_mode, bpm 
\ No newline at end of file
+    return elements_to_play, apply_individual_shifts, playback_mode, bpm, tempo_changes, transpose_semitones 
\ No newline at end of file
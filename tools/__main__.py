@@ -0,0 +1,81 @@
+"""Runs several analysis tools over many scores in one process.
+
+Each script under tools/ pays music21's import and setup cost on every run.
+Going through this dispatcher imports music21 once for a whole batch:
+
+    python -m tools analyze scores/a.mxl scores/b.mxl
+    python -m tools parts scores/*.mxl
+    python -m tools dump-pitches scores/a.mxl scores/b.mxl
+    python -m tools repeats scores/Canon_in_D.mxl F#5 E5
+
+Run it from the project root. The individual scripts still work on their own.
+"""
+import argparse
+import os
+import sys
+
+
+def _existing(paths):
+    """Yields the paths that exist, reporting the ones that don't."""
+    for path in paths:
+        if os.path.exists(path):
+            yield path
+        else:
+            print(f"Error: File not found: {path}", file=sys.stderr)
+
+
+def _analyze(args):
+    from tools.analyze_score import analyze_pitch_range
+    for path in _existing(args.files):
+        analyze_pitch_range(path)
+
+
+def _parts(args):
+    from tools.check_parts import analyze_score_structure
+    for path in _existing(args.files):
+        analyze_score_structure(path)
+
+
+def _dump_pitches(args):
+    from tools.dump_pitches import dump_pitches
+    for path in _existing(args.files):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        dump_pitches(path, os.path.join(args.output_dir, f"{stem}_pitches.txt"))
+
+
+def _repeats(args):
+    from tools.analyze_canon_repeats import analyze_repeats
+    for path in _existing([args.file]):
+        for pitch_name in args.pitches:
+            analyze_repeats(path, pitch_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m tools',
+                                     description='Run score analysis tools over many files in one process.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyze = commands.add_parser('analyze', help='Pitch range of each score (analyze_score.py).')
+    analyze.add_argument('files', nargs='+')
+    analyze.set_defaults(run=_analyze)
+
+    parts = commands.add_parser('parts', help='Part structure of each score (check_parts.py).')
+    parts.add_argument('files', nargs='+')
+    parts.set_defaults(run=_parts)
+
+    dump = commands.add_parser('dump-pitches', help='Write <name>_pitches.txt for each score (dump_pitches.py).')
+    dump.add_argument('files', nargs='+')
+    dump.add_argument('-o', '--output-dir', default='.', help='Directory for the pitch lists. Default: current directory.')
+    dump.set_defaults(run=_dump_pitches)
+
+    repeats = commands.add_parser('repeats', help='Occurrences of the given pitches in a score (analyze_canon_repeats.py).')
+    repeats.add_argument('file')
+    repeats.add_argument('pitches', nargs='+', help='Pitch names such as F#5.')
+    repeats.set_defaults(run=_repeats)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
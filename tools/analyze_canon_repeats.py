@@ -14,9 +14,9 @@ def analyze_repeats(file_path, pitch_focus="F#5"):
         score = converter.parse(file_path)
         found_count = 0
         # Iterate through all notes in the score
-        # Use score.flat.getElementsByClass([note.Note, chord.Chord]) 
-        # as .flat.notes might miss things depending on structure and version
-        for element in score.flat.getElementsByClass([note.Note, chord.Chord]): 
+        # Use score.flatten().getElementsByClass([note.Note, chord.Chord]) 
+        # as .flatten().notes might miss things depending on structure and version
+        for element in score.flatten().getElementsByClass([note.Note, chord.Chord]): 
             pitches_in_element = []
             is_target_in_element = False
             element_pitch_names = []
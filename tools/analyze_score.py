@@ -2,7 +2,7 @@ import os
 import sys
 
 try:
-    from music21 import chord, converter, note, pitch
+    from music21 import converter
 except ImportError:
     print("Error: music21 library not found.", file=sys.stderr)
     print("Please install it using: pip install music21", file=sys.stderr)
@@ -21,19 +21,12 @@ def analyze_pitch_range(file_path):
     max_pitch = None
 
     try:
-        # Iterate through all notes and chords in the flattened score
-        for element in score.flat.notes:
-            current_pitches = []
-            if isinstance(element, note.Note):
-                current_pitches.append(element.pitch)
-            elif isinstance(element, chord.Chord):
-                current_pitches.extend(element.pitches)
-            
-            for p in current_pitches:
-                if min_pitch is None or p.midi < min_pitch.midi:
-                    min_pitch = p
-                if max_pitch is None or p.midi > max_pitch.midi:
-                    max_pitch = p
+        # Stream.pitches collects every note and chord pitch in one traversal; order doesn't matter for a range
+        for p in score.pitches:
+            if min_pitch is None or p.midi < min_pitch.midi:
+                min_pitch = p
+            if max_pitch is None or p.midi > max_pitch.midi:
+                max_pitch = p
 
         if min_pitch is None or max_pitch is None:
              print("No notes found in the score.")
@@ -2,7 +2,7 @@ import os
 import sys
 
 try:
-    from music21 import chord, converter, note, pitch
+    from music21 import converter
 except ImportError:
     print("Error: music21 library not found.", file=sys.stderr)
     print("Please install it using: pip install music21", file=sys.stderr)
@@ -18,27 +18,19 @@ def dump_pitches(input_path, output_path):
         print(f"Error parsing file: {e}", file=sys.stderr)
         return
 
-    pitches_found = []
     try:
-        # Iterate through all notes and chords in the flattened score
-        for element in score.flat.notes:
-            if isinstance(element, note.Note):
-                p = element.pitch
-                pitches_found.append(f"{p.nameWithOctave} (MIDI: {p.midi})")
-            elif isinstance(element, chord.Chord):
-                for p in element.pitches:
-                    pitches_found.append(f"{p.nameWithOctave} (MIDI: {p.midi})")
-        
-        print(f"Found {len(pitches_found)} note events.")
-
-        # Write to output file
-        with open(output_path, 'w', encoding='utf-8') as f:
+        # Write each pitch as it is found instead of collecting the whole list first
+        pitch_count = 0
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
             f.write("# Pitch List Extracted from: " + os.path.basename(input_path) + "\n")
             f.write("# Format: StandardNameWithOctave (MIDI: MIDINumber)\n")
             f.write("----------------------------------------------------\n")
-            for pitch_info in pitches_found:
-                f.write(pitch_info + '\n')
-        
+            # Pitches of all notes and chords in the flattened score, in offset order
+            for p in score.flatten().pitches:
+                f.write(f"{p.nameWithOctave} (MIDI: {p.midi})\n")
+                pitch_count += 1
+
+        print(f"Found {pitch_count} note events.")
         print(f"Pitch list saved to: {output_path}")
 
     except Exception as e:
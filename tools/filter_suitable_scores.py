@@ -1,10 +1,17 @@
 import argparse  # Added for command-line arguments
+import functools
+import hashlib
+import json
 import os
 import shutil
 import sys
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 try:
-    from music21 import chord, converter, note, pitch, stream
+    from music21 import converter, stream
 except ImportError:
     print("Error: music21 library not found.", file=sys.stderr)
     print("Please install it using: pip install music21", file=sys.stderr)
@@ -17,47 +24,208 @@ MIN_MIDI = 48 # C3
 MAX_MIDI = 83 # B5
 # --- End Configuration ---
 
-def get_score_range(score_stream):
+SCORE_EXTENSIONS = ('.mxl', '.musicxml') # Same as score.SCORE_EXTENSIONS
+
+STEP_SEMITONES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+NO_PITCH_MIN = 1 << 16 # Above any pitch the XML can spell
+NO_PITCH_MAX = -(1 << 16)
+# Ranges of files already analyzed, kept in SOURCE_DIR so reruns with another tolerance skip parsing
+RANGE_CACHE_NAME = ".range_cache.json"
+RANGE_CACHE_VERSION = 2 # Bump whenever the meaning of the stored ranges changes
+
+def get_score_range(score_stream, stop_below=None, stop_above=None):
     """Finds the min and max MIDI pitch in a music21 stream.
        Returns (min_midi, max_midi) or (None, None) if no notes.
+       If stop_below and stop_above are given, iteration stops as soon as the range
+       reaches past both, so the result may then be narrower than the full range.
     """
-    min_midi = float('inf')
-    max_midi = float('-inf')
-    has_notes = False
+    min_midi = max_midi = None
     try:
-        # Use .flatten().notes to handle nested streams correctly
-        notes_iterator = score_stream.flatten().notes
+        # recurse() walks nested streams in place; order doesn't matter for a range, so no flat copy is needed
+        notes_iterator = score_stream.recurse().notes
         for element in notes_iterator:
-            has_notes = True
-            current_pitches = []
-            if isinstance(element, note.Note):
-                # Skip grace notes as they might have unusual ranges
-                if element.duration.isGrace:
+            # Skip grace notes (and grace chords) as they might have unusual ranges
+            if element.duration.isGrace:
+                continue
+            # Notes and chords both expose .pitches (a Note's is just its own pitch)
+            for p in element.pitches:
+                midi = p.midi
+                if midi is None: # Ensure pitch has a MIDI value
                     continue
-                current_pitches.append(element.pitch)
-            elif isinstance(element, chord.Chord):
-                 # Skip grace notes within chords
-                if element.duration.isGrace:
-                     continue
-                current_pitches.extend(element.pitches)
-            
-            for p in current_pitches:
-                if p.midi is not None: # Ensure pitch has a MIDI value
-                    min_midi = min(min_midi, p.midi)
-                    max_midi = max(max_midi, p.midi)
+                if min_midi is None or midi < min_midi:
+                    min_midi = midi
+                if max_midi is None or midi > max_midi:
+                    max_midi = midi
+            if stop_below is not None and min_midi is not None and min_midi < stop_below and max_midi > stop_above:
+                break # Out of range on both sides: the rest can't change the verdict
     except stream.StreamException as e:
         print(f"  - Warning: Error iterating notes in stream: {e}", file=sys.stderr)
         return None, None # Cannot determine range
     except Exception as e:
         print(f"  - Warning: Unexpected error during range analysis: {e}", file=sys.stderr)
         return None, None
-        
-    if not has_notes or min_midi == float('inf'):
-        return None, None # No notes found or only grace notes
-    return min_midi, max_midi
 
-def check_and_move_scores(tolerance, include_melody_fallback):
-    """Checks scores in SOURCE_DIR and moves suitable ones to DEST_DIR, applying tolerance and fallback."""
+    return min_midi, max_midi # Both None if no notes found or only grace notes
+
+def _musicxml_member(archive):
+    """Name of the score document inside an .mxl archive, as listed in META-INF/container.xml."""
+    try:
+        rootfile = ET.fromstring(archive.read('META-INF/container.xml')).find('.//{*}rootfile')
+    except KeyError:
+        rootfile = None
+    if rootfile is not None and rootfile.get('full-path'):
+        return rootfile.get('full-path')
+    for name in archive.namelist():
+        if not name.startswith('META-INF/') and name.lower().endswith(('.xml', '.musicxml')):
+            return name
+    raise ValueError("No MusicXML document found in archive")
+
+def _scan_pitch_ranges(xml_file, stop_below=None, stop_above=None, stop_at_melody_note=False):
+    """Streams a partwise MusicXML document and returns
+    (min_full, max_full, has_parts, min_melody, max_melody, range_complete).
+
+    Only <pitch> elements are read; grace notes are skipped, like get_score_range.
+    The melody is staff 1 of the first <part> (notes without a <staff> are on staff 1):
+    music21 splits a multi-staff part into one PartStaff per staff, so score.parts[0]
+    is only its top staff. Chord symbols (<harmony>) are played as chords, and music21
+    picks their octaves itself, so a score that has any is left to music21 (ValueError).
+    If stop_below and stop_above are given, reading stops as soon as the range reaches
+    past both, since the score is rejected either way; range_complete is then False.
+    With stop_at_melody_note, reading stops at the first melody note instead, for
+    when the melody fallback accepts any score whose first part has notes.
+    """
+    # Int sentinels beyond any MIDI number, so the hot loop does plain int compares with no None checks
+    min_full = min_melody = NO_PITCH_MIN
+    max_full = max_melody = NO_PITCH_MAX
+    part_index = -1
+    range_complete = True
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == 'part':
+                part_index += 1
+            elif tag == 'score-timewise':
+                raise ValueError("Timewise MusicXML is not supported by the fast reader")
+            elif tag == 'harmony':
+                raise ValueError("Chord symbols are voiced by music21")
+            continue
+
+        if tag == 'note':
+            note_pitch = elem.find('pitch')
+            if note_pitch is not None and elem.find('grace') is None:
+                alter = note_pitch.findtext('alter')
+                midi = ((int(note_pitch.findtext('octave')) + 1) * 12
+                        + STEP_SEMITONES[note_pitch.findtext('step').strip()]
+                        + (round(float(alter)) if alter else 0))
+                if midi < min_full:
+                    min_full = midi
+                if midi > max_full:
+                    max_full = midi
+                if part_index == 0 and (elem.findtext('staff') or '1').strip() == '1':
+                    if midi < min_melody:
+                        min_melody = midi
+                    if midi > max_melody:
+                        max_melody = midi
+                    if stop_at_melody_note:
+                        range_complete = False
+                        break
+                if stop_below is not None and min_full < stop_below and max_full > stop_above:
+                    range_complete = False
+                    break
+            elem.clear() # Keep memory flat: nothing under a finished note is needed again
+        elif tag == 'measure':
+            elem.clear()
+    if min_full == NO_PITCH_MIN:
+        min_full = max_full = None
+    if min_melody == NO_PITCH_MIN:
+        min_melody = max_melody = None
+    return min_full, max_full, part_index >= 0, min_melody, max_melody, range_complete
+
+def read_score_ranges(source_path, stop_below=None, stop_above=None, stop_at_melody_note=False):
+    """Pitch ranges of a .musicxml or .mxl file read straight from the XML, without building music21 objects."""
+    if source_path.lower().endswith('.mxl'):
+        with zipfile.ZipFile(source_path) as archive, archive.open(_musicxml_member(archive)) as xml_file:
+            return _scan_pitch_ranges(xml_file, stop_below, stop_above, stop_at_melody_note)
+    with open(source_path, 'rb') as xml_file:
+        return _scan_pitch_ranges(xml_file, stop_below, stop_above, stop_at_melody_note)
+
+def analyze_score_file(source_path, effective_min_midi, effective_max_midi, include_melody_fallback):
+    """Returns (min_full, max_full, has_parts, min_melody, max_melody, range_complete) for one score.
+
+    Runs in a worker process, so only these ints travel back, never music21 objects.
+    The ranges are read from the XML directly; music21 is only used for files the
+    fast reader can't handle. Complete results don't depend on the tolerance, so
+    the melody range is always included and they can be cached.
+
+    With the melody fallback, a score whose first part has notes is moved whatever
+    its full range, so the full range isn't read for it (range_complete is False).
+    Without it, a score reaching past both ends is rejected no matter what else it holds.
+    """
+    stop_below, stop_above = (None, None) if include_melody_fallback else (effective_min_midi, effective_max_midi)
+    try:
+        return read_score_ranges(source_path, stop_below, stop_above, stop_at_melody_note=include_melody_fallback)
+    except (ET.ParseError, zipfile.BadZipFile, KeyError, ValueError, TypeError, AttributeError):
+        pass # Unusual layout or malformed pitch data: let music21 deal with it
+    score = converter.parse(source_path)
+    has_parts = bool(score.parts)
+    min_melody = max_melody = None
+    if has_parts:
+        min_melody, max_melody = get_score_range(score.parts[0])
+        if include_melody_fallback and min_melody is not None:
+            return min_melody, max_melody, True, min_melody, max_melody, False
+    min_full, max_full = get_score_range(score, stop_below, stop_above)
+    # Past both bounds the scan may have stopped early, so report that range as a lower bound
+    range_complete = stop_below is None or min_full is None or not (min_full < stop_below and max_full > stop_above)
+    return min_full, max_full, has_parts, min_melody, max_melody, range_complete
+
+def _analyze_score_file_safe(source_path, effective_min_midi, effective_max_midi, include_melody_fallback):
+    """analyze_score_file that returns (None, error) instead of raising, so one bad file doesn't stop the batch."""
+    try:
+        return analyze_score_file(source_path, effective_min_midi, effective_max_midi, include_melody_fallback), None
+    except Exception as e:
+        return None, e
+
+def _file_digest(path):
+    """Content hash of a file, or None if it can't be read (it is then parsed on its own)."""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.blake2b(f.read(), digest_size=16).digest()
+    except OSError:
+        return None
+
+def _load_range_cache(cache_path):
+    """Returns {filename: [size, mtime_ns, min_full, max_full, has_parts, min_melody, max_melody]},
+    empty if unreadable or written by another RANGE_CACHE_VERSION."""
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get('version') != RANGE_CACHE_VERSION:
+        return {}
+    files = cache.get('files')
+    return files if isinstance(files, dict) else {}
+
+def _save_range_cache(cache_path, cache):
+    """Writes the range cache through a temporary file, so an interrupted run never leaves it half-written."""
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': RANGE_CACHE_VERSION, 'files': cache}, f)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        print(f"Warning: Could not write range cache '{cache_path}': {e}", file=sys.stderr)
+
+def check_and_move_scores(tolerance, include_melody_fallback, quiet=False, jobs=None):
+    """Checks scores in SOURCE_DIR and moves suitable ones to DEST_DIR, applying tolerance and fallback.
+
+    With quiet, per-file progress is not printed; errors and the summary still are.
+    jobs is the number of parse processes (default: one per core).
+    """
     effective_min_midi = MIN_MIDI - tolerance
     effective_max_midi = MAX_MIDI + tolerance
     print(f"Checking scores in '{SOURCE_DIR}'...")
@@ -76,47 +244,121 @@ def check_and_move_scores(tolerance, include_melody_fallback):
     skipped_count = 0
     error_count = 0
 
-    for filename in os.listdir(SOURCE_DIR):
-        source_path = os.path.join(SOURCE_DIR, filename)
-        dest_path = os.path.join(DEST_DIR, filename)
+    # DirEntry carries the file type from the directory listing, so only matching files get stat'ed
+    with os.scandir(SOURCE_DIR) as it:
+        entries = [entry for entry in it
+                   if entry.name.lower().endswith(SCORE_EXTENSIONS) and entry.is_file()]
+    filenames = [entry.name for entry in entries]
+
+    # Files whose size and mtime match the cache reuse their ranges; only the rest get parsed
+    cache_path = os.path.join(SOURCE_DIR, RANGE_CACHE_NAME)
+    range_cache = _load_range_cache(cache_path)
+    new_range_cache = {}
+    file_stats = {entry.name: entry.stat() for entry in entries}
+    cached_analyses = {}
+    for filename in filenames:
+        entry = range_cache.get(filename)
+        st = file_stats[filename]
+        if isinstance(entry, list) and len(entry) == 7 and entry[:2] == [st.st_size, st.st_mtime_ns]:
+            cached_analyses[filename] = (*entry[2:], True)
+    if cached_analyses:
+        print(f"Using cached ranges for {len(cached_analyses)} of {len(filenames)} files.")
+
+    # Identical files (copies, repeated downloads) are parsed once; hashing is far cheaper than parsing
+    first_by_digest = {}
+    duplicate_of = {}
+    duplicates_by_original = {}
+    for entry in entries:
+        if entry.name in cached_analyses:
+            continue
+        digest = _file_digest(entry.path)
+        if digest is not None:
+            original = first_by_digest.setdefault(digest, entry.name)
+            if original != entry.name:
+                duplicate_of[entry.name] = original
+                duplicates_by_original.setdefault(original, []).append(entry.name)
+    if duplicate_of:
+        print(f"Found {len(duplicate_of)} files with the same content as an earlier one; they reuse its analysis.")
 
-        if filename.lower().endswith(('.mxl', '.musicxml')) and os.path.isfile(source_path):
-            print(f"\nChecking: {filename}")
-            move_file = False
-            move_reason = "Unknown"
+    # Parsing is CPU-bound and independent per file, so it runs on all cores;
+    # files are handled here as soon as their result arrives, so one slow parse doesn't hold back the moves
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+        analyze = functools.partial(_analyze_score_file_safe, effective_min_midi=effective_min_midi,
+                                    effective_max_midi=effective_max_midi,
+                                    include_melody_fallback=include_melody_fallback)
+        futures = {executor.submit(analyze, entry.path): entry.name
+                   for entry in entries if entry.name not in cached_analyses and entry.name not in duplicate_of}
 
+        def as_ready():
+            """Yields (filename, (analysis, error)): cached files first, then parsed ones in completion order.
+
+            Duplicates follow right after the file they copy.
+            """
+            for filename in filenames:
+                if filename in cached_analyses:
+                    yield filename, (cached_analyses[filename], None)
+            for future in as_completed(futures):
+                filename, result = futures[future], future.result()
+                yield filename, result
+                for duplicate in duplicates_by_original.get(filename, ()):
+                    yield duplicate, result
+
+        for filename, (analysis, parse_err) in as_ready():
+            # Each file's lines go out in one write (errors in one more), not one print per line
+            lines = []
+            report = lines.append
+            error_line = None
             try:
-                score = converter.parse(source_path)
-                min_full, max_full = get_score_range(score)
+                source_path = os.path.join(SOURCE_DIR, filename)
+                dest_path = os.path.join(DEST_DIR, filename)
+
+                report(f"\nChecking: {filename}")
+                if filename in duplicate_of:
+                    report(f"  - Same content as '{duplicate_of[filename]}'")
+                move_file = False
+                move_reason = "Unknown"
+
+                if parse_err is not None:
+                    error_line = f"  - Error processing file: {parse_err}"
+                    error_count += 1
+                    continue
+
+                min_full, max_full, has_parts, min_melody, max_melody, range_complete = analysis
+                if range_complete:
+                    st = file_stats[filename]
+                    new_range_cache[filename] = [st.st_size, st.st_mtime_ns, *analysis[:5]]
 
                 if min_full is None:
-                    print("  - Skipped (No notes found)")
+                    report("  - Skipped (No notes found)")
                     skipped_count += 1
                     continue
 
-                print(f"  - Full Range: MIDI {min_full} - {max_full}")
+                if range_complete:
+                    report(f"  - Full Range: MIDI {min_full} - {max_full}")
+                elif include_melody_fallback:
+                    report("  - Full Range: not checked (Part 1 has notes, so the melody fallback applies)")
+                else:
+                    report(f"  - Full Range: at least MIDI {min_full} - {max_full} (stopped reading early)")
                 # --- Check 1: Full score within tolerance --- 
-                if min_full >= effective_min_midi and max_full <= effective_max_midi:
+                if range_complete and min_full >= effective_min_midi and max_full <= effective_max_midi:
                     move_file = True
                     move_reason = f"Full score within tolerance {tolerance}"
-                
+            
                 # --- Check 2: Melody fallback (if enabled and Check 1 failed) ---
                 elif include_melody_fallback:
-                    print("  - Full score outside tolerance. Checking melody fallback...")
-                    if not score.parts:
-                         print("  - Skipped (Melody fallback: Score has no parts)")
+                    if range_complete:
+                        report("  - Full score outside tolerance. Checking melody fallback...")
+                    if not has_parts:
+                         report("  - Skipped (Melody fallback: Score has no parts)")
                          skipped_count += 1
+                    elif min_melody is None:
+                        report("  - Skipped (Melody fallback: Part 1 has no notes)")
+                        skipped_count += 1
                     else:
-                        melody_part = score.parts[0]
-                        min_melody, max_melody = get_score_range(melody_part)
-                        if min_melody is None:
-                            print("  - Skipped (Melody fallback: Part 1 has no notes)")
-                            skipped_count += 1
-                        else:
-                           # If Part 1 has notes, it's considered potentially playable via transposition
-                           move_file = True
-                           move_reason = "Melody (Part 1) suitable for transposition"
-                
+                       # If Part 1 has notes, it's considered potentially playable via transposition
+                       move_file = True
+                       move_reason = "Melody (Part 1) suitable for transposition"
+            
                 # --- Skipped (If Check 1 failed and Check 2 disabled/failed) ---
                 else:
                     reason = []
@@ -124,24 +366,31 @@ def check_and_move_scores(tolerance, include_melody_fallback):
                         reason.append(f"too low ({min_full} < {effective_min_midi})")
                     if max_full > effective_max_midi:
                         reason.append(f"too high ({max_full} > {effective_max_midi})")                    
-                    print(f"  - Skipped (Outside tolerance: {', '.join(reason)})")
+                    report(f"  - Skipped (Outside tolerance: {', '.join(reason)})")
                     skipped_count += 1
 
                 # --- Perform Move --- 
                 if move_file:
-                    print(f"  - OK ({move_reason}): Moving to '{DEST_DIR}'...")
+                    report(f"  - OK ({move_reason}): Moving to '{DEST_DIR}'...")
                     try:
-                        shutil.move(source_path, dest_path)
+                        try:
+                            os.replace(source_path, dest_path) # Plain rename when both dirs share a filesystem
+                        except OSError:
+                            shutil.move(source_path, dest_path) # e.g. across devices: copy and delete
                         moved_count += 1
+                        new_range_cache.pop(filename, None) # No longer in SOURCE_DIR
                     except Exception as move_err:
-                        print(f"  - Error moving file: {move_err}", file=sys.stderr)
+                        error_line = f"  - Error moving file: {move_err}"
                         error_count += 1
                         move_file = False # Don't count as moved if error occurs
-            
-            except Exception as parse_err:
-                print(f"  - Error processing file: {parse_err}", file=sys.stderr)
-                error_count += 1
-        
+            finally:
+                if lines and not quiet:
+                    sys.stdout.write('\n'.join(lines) + '\n')
+                if error_line:
+                    sys.stdout.flush() # Keep the error below its file's lines
+                    sys.stderr.write((f"{filename}\n" if quiet else '') + error_line + '\n')
+
+    _save_range_cache(cache_path, new_range_cache)
     print("\nFinished.")
     print(f"Moved: {moved_count}, Skipped: {skipped_count}, Errors: {error_count}")
 
@@ -161,6 +410,17 @@ if __name__ == "__main__":
         action='store_true', # Makes it a flag, default is False
         help='If the full score is outside the tolerated range, also move the file \nif Part 1 (assumed melody) exists and contains notes (playable via transposition).'
     )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of processes parsing scores in parallel. \nDefault: one per CPU core.'
+    )
+    parser.add_argument(
+        '-q', '--quiet',
+        action='store_true',
+        help='Only print errors and the final summary, not the per-file report.'
+    )
     args = parser.parse_args()
 
-    check_and_move_scores(args.tolerance, args.include_melody_fallback) 
\ No newline at end of file
+    check_and_move_scores(args.tolerance, args.include_melody_fallback, args.quiet, args.jobs) 
\ No newline at end of file
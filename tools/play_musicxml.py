@@ -4,6 +4,8 @@ import tempfile
 import music21
 import pygame
 
+MUSIC_END_EVENT = pygame.USEREVENT + 1
+
 
 def play_musicxml(file_path):
     """
@@ -65,12 +67,22 @@ def play_musicxml(file_path):
         # Load and play the MIDI file
         try:
             pygame.mixer.music.load(midi_filename)
+            pygame.mixer.music.set_endevent(MUSIC_END_EVENT)
             print(f"Playing MIDI file: {midi_filename}...")
             pygame.mixer.music.play()
 
-            # Keep the script running while music plays
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10) # Check every 100ms
+            # Keep the script running while music plays: block until the end event arrives
+            try:
+                pygame.display.init() # The event queue needs the video subsystem
+                pygame.event.set_blocked(None)
+                pygame.event.set_allowed(MUSIC_END_EVENT)
+                while pygame.event.wait().type != MUSIC_END_EVENT:
+                    pass
+            except pygame.error:
+                # No video driver (e.g. headless): fall back to polling
+                clock = pygame.time.Clock()
+                while pygame.mixer.music.get_busy():
+                    clock.tick(10) # Check every 100ms
 
         except pygame.error as e:
             print(f"Error playing MIDI file: {e}")
@@ -20,32 +20,43 @@ except ImportError:
 
 def format_element_info(element):
     """Formats information about a music21 element into a string."""
-    info = f"Offset={float(element.offset):<6.2f} "
-    info += f"Dur={element.duration.quarterLength:<5.2f} "
-    info += f"Class={element.__class__.__name__:<15} "
-    if hasattr(element, 'pitches'):
-         info += f"Pitches={[p.nameWithOctave for p in element.pitches]} "
-    elif hasattr(element, 'pitch'):
-         info += f"Pitch={element.pitch.nameWithOctave} "
+    # Look up each attribute once; getattr with a default replaces hasattr followed by a second fetch
+    is_chord = isinstance(element, chord.Chord)
+    parts = [
+        f"Offset={float(element.offset):<6.2f}",
+        f"Dur={element.duration.quarterLength:<5.2f}",
+        f"Class={type(element).__name__:<15}",
+    ]
+    pitches = getattr(element, 'pitches', None)
+    if pitches is not None:
+         parts.append(f"Pitches={[p.nameWithOctave for p in pitches]}")
+    else:
+         element_pitch = getattr(element, 'pitch', None)
+         if element_pitch is not None:
+              parts.append(f"Pitch={element_pitch.nameWithOctave}")
     # Don't show articulations/expressions for chords after chordify for brevity
     # But show them for the original stream
-    if not (isinstance(element, chord.Chord) and element.derivation.method == 'chordify'): 
-        if hasattr(element, 'articulations') and element.articulations:
-             info += f"Artic={[a.__class__.__name__ for a in element.articulations]} "
-        if hasattr(element, 'expressions') and element.expressions:
+    if not (is_chord and element.derivation.method == 'chordify'):
+        element_articulations = getattr(element, 'articulations', None)
+        if element_articulations:
+             parts.append(f"Artic={[a.__class__.__name__ for a in element_articulations]}")
+        element_expressions = getattr(element, 'expressions', None)
+        if element_expressions:
              expr_strs = []
-             for e in element.expressions:
+             for e in element_expressions:
                   expr_str = e.__class__.__name__
                   if isinstance(e, expressions.SustainPedal):
                        expr_str += f"(type={getattr(e, 'type', 'unknown')})"
                   expr_strs.append(expr_str)
-             info += f"Expr={expr_strs} "
+             parts.append(f"Expr={expr_strs}")
     if isinstance(element, spanner.Spanner):
-         info += f"SpannedIDs={[el.id if hasattr(el, 'id') else repr(el) for el in element.getSpannedElements()]} "
+         parts.append(f"SpannedIDs={[el.id if hasattr(el, 'id') else repr(el) for el in element.getSpannedElements()]}")
     # Check for tie only if the element might have one (Note, Chord)
-    if isinstance(element, (note.Note, chord.Chord)) and element.tie:
-         info += f"Tie={element.tie.type} "
-    return info.strip()
+    if is_chord or isinstance(element, note.Note):
+         tie = element.tie
+         if tie:
+              parts.append(f"Tie={tie.type}")
+    return ' '.join(parts).strip()
 
 def save_stream_elements(m21_stream, output_filename):
     """Iterates through a stream's flat elements and saves formatted info to a file."""
@@ -57,7 +68,7 @@ def save_stream_elements(m21_stream, output_filename):
             f.write(f"# Derivation Method: {m21_stream.derivation.method if m21_stream.derivation else 'Original'}\n")
             f.write("---------------------------------------------------\n")
             # Iterate through all elements, not just notes/chords, to see everything
-            for element in m21_stream.flat.elements:
+            for element in m21_stream.flatten().elements:
                 f.write(format_element_info(element) + '\n')
                 count += 1
         print(f"Saved {count} elements to '{output_filename}'.")